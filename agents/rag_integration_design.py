@@ -5,53 +5,257 @@ Seamless Cross-Agent Knowledge Sharing
 DESIGN: Shared Knowledge Base + Agent Specialization
 """
 
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import itertools
 import json
+import queue
+import re
+import sys
+import threading
+import time
 
-@dataclass
+from logger_config import log_error
+
+# Try to import Aho-Corasick multi-pattern matcher (optional)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Try to import RE2 linear-time regex engine (optional)
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+# Try to import orjson for faster serialization (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Entity patterns, compiled once. The name pattern runs on every turn, so it
+# uses RE2 when installed; the pattern is plain enough for either engine.
+_NAME_RE = (re2 if RE2_AVAILABLE else re).compile(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b')
+
+# Pronouns/references and service names share one scan, told apart by group name
+_REF_SVC_RE = re.compile(
+    r'\b(?:(?P<ref>that user|this user|him|her|they|that service|this service)'
+    r'|(?P<svc>room service|housekeeping|maintenance|wifi|ac))\b',
+    re.IGNORECASE
+)
+
+# Fixed reference/service vocabulary for the single-pass Aho-Corasick scanner
+_REFERENCE_TERMS = ("that user", "this user", "him", "her", "they", "that service", "this service")
+_SERVICE_TERMS = ("room service", "housekeeping", "maintenance", "wifi", "ac")
+
+def _build_vocabulary_automaton():
+    """Build one automaton over all reference and service terms"""
+    automaton = ahocorasick.Automaton()
+    for kind, terms in (("ref", _REFERENCE_TERMS), ("svc", _SERVICE_TERMS)):
+        for term in terms:
+            automaton.add_word(term, (kind, len(term)))
+    automaton.make_automaton()
+    return automaton
+
+_VOCAB_AUTOMATON = _build_vocabulary_automaton() if AHOCORASICK_AVAILABLE else None
+
+def _canonical_json(value: Any) -> bytes:
+    """Key-sorted JSON bytes for hashing - orjson when installed"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(value, default=str,
+                                option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. ints beyond 64 bits - stdlib json handles them
+    return json.dumps(value, sort_keys=True, default=str).encode()
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+def _on_word_boundary(text: str, start: int, end: int) -> bool:
+    """True if text[start:end] is not embedded in a longer word"""
+    if start > 0 and _is_word_char(text[start - 1]):
+        return False
+    return not (end < len(text) and _is_word_char(text[end]))
+
+class MessageLog:
+    """
+    Message history stored as parallel arrays (roles, contents, timestamps).
+    Role filters and content joins touch only the list they need.
+    """
+    __slots__ = ("roles", "contents", "ts")
+    
+    def __init__(self):
+        self.roles: List[str] = []
+        self.contents: List[str] = []
+        self.ts: List[float] = []
+    
+    def append(self, role: str, content: str, timestamp: Optional[float] = None):
+        # Interned roles compare by identity
+        self.roles.append(sys.intern(role))
+        self.contents.append(content)
+        self.ts.append(timestamp if timestamp is not None else time.time())
+    
+    def last_content(self, role: str) -> Optional[str]:
+        """Content of the most recent message with the given role"""
+        role = sys.intern(role)
+        roles = self.roles
+        for i in range(len(roles) - 1, -1, -1):
+            if roles[i] is role:
+                return self.contents[i]
+        return None
+    
+    def __len__(self) -> int:
+        return len(self.roles)
+
+@dataclass(slots=True)
 class ConversationContext:
     """Shared context across all agents"""
     session_id: str
     user_id: str
     current_topic: str
     entities_mentioned: List[str]  # users, services, issues mentioned
-    conversation_history: List[Dict]
+    conversation_history: MessageLog
     active_operations: List[Dict]  # ongoing user creation, service requests, etc.
     resolved_entities: Dict[str, Any]  # resolved references like "john" → user_id_123
 
+@dataclass(slots=True)
+class ConvSlot:
+    """
+    Per-session memory entry. Identity fields never change after creation and
+    are read without locking; only the mutable body sits behind body_lock.
+    """
+    session_id: str
+    user_id: str
+    agent_name: str
+    body_lock: threading.Lock = field(default_factory=threading.Lock)
+    body: Optional[ConversationContext] = None
+
 class RAGKnowledgeBase:
     """
     Unified knowledge base that all agents can query and update
     """
     
+    __slots__ = (
+        "vector_store", "conversation_memory", "_memory_lock", "entity_resolver",
+        "_resolve_pool", "_doc_counter",
+        "_write_buf", "_buf_lock", "_flush_timer",
+        "_pending_entities", "_pending_lock", "_entity_hashes",
+        "_session_entity_index", "_session_entity_automata", "_entity_index_lock",
+        "_rag_queue", "_rag_worker_thread",
+    )
+    
+    # Vector store writes are buffered and flushed in batches
+    WRITE_BATCH_SIZE = 32
+    WRITE_FLUSH_INTERVAL = 0.2  # seconds
+    
     def __init__(self):
         self.vector_store = None  # ChromaDB, Pinecone, etc.
-        self.conversation_memory = {}
+        self.conversation_memory: Dict[str, ConvSlot] = {}
+        self._memory_lock = threading.Lock()  # guards the outer session -> slot map
         self.entity_resolver = EntityResolver()
+        self._resolve_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="entity_resolve")
+        self._doc_counter = itertools.count()  # unique suffix for conversation document ids
+        
+        self._write_buf = []
+        self._buf_lock = threading.Lock()
+        self._flush_timer = None
+        
+        # Entity writes coalesce per turn: (entity_type, entity_id, session_id) -> (data, timestamp)
+        self._pending_entities: Dict[tuple, Tuple[Dict[str, Any], Optional[str]]] = {}
+        self._pending_lock = threading.Lock()
+        
+        # session_id -> doc id -> digest of the last data written, so unchanged entities are not re-embedded
+        self._entity_hashes: Dict[str, Dict[str, bytes]] = {}
+        
+        # session_id -> lowercased entity name -> (entity_id, data); mirrored into an
+        # Aho-Corasick automaton per session when available
+        self._session_entity_index: Dict[str, Dict[str, Tuple[str, Dict[str, Any]]]] = {}
+        self._session_entity_automata: Dict[str, Any] = {}
+        self._entity_index_lock = threading.Lock()
+        
+        # Conversation contexts and full write batches are handled off the
+        # request path by one background worker
+        self._rag_queue = queue.Queue()  # (handler, args) items
+        self._rag_worker_thread = threading.Thread(target=self._rag_worker, daemon=True)
+        self._rag_worker_thread.start()
+    
+    def _rag_worker(self):
+        """Consume queued conversation contexts and write batches"""
+        while True:
+            handler, args = self._rag_queue.get()
+            try:
+                handler(*args)
+            except Exception as e:
+                # A failed knowledge write must not kill the worker
+                log_error("RAG_WRITE_ERROR", str(e), "_rag_worker")
+            finally:
+                self._rag_queue.task_done()
     
-    def store_conversation_context(self, context: ConversationContext):
+    def enqueue_context(self, context: ConversationContext, now_iso: Optional[str] = None):
+        """Queue a conversation context for the background worker to store"""
+        self._rag_queue.put_nowait((self.store_conversation_context, (context, now_iso)))
+    
+    def drain(self):
+        """Wait for queued contexts and batches to be stored, then flush pending writes"""
+        self._rag_queue.join()
+        self.flush()
+    
+    def _get_slot(self, session_id: str, user_id: str, agent_name: str) -> ConvSlot:
+        """Get or create the memory slot for a session"""
+        
+        slot = self.conversation_memory.get(session_id)
+        if slot is None:
+            with self._memory_lock:
+                slot = self.conversation_memory.setdefault(
+                    session_id, ConvSlot(session_id, user_id, sys.intern(agent_name))
+                )
+        return slot
+    
+    def store_conversation_context(self, context: ConversationContext,
+                                   now_iso: Optional[str] = None):
         """Store conversation context for cross-agent access"""
         
+        session_id = context.session_id
+        slot = self._get_slot(session_id, context.user_id, context.current_topic)
+        with slot.body_lock:
+            slot.body = context
+        
         # Index conversation for semantic search
-        conversation_text = " ".join([msg["content"] for msg in context.conversation_history])
+        conversation_text = " ".join(context.conversation_history.contents)
         
         # Store with metadata for filtering
         metadata = {
-            "session_id": context.session_id,
+            "session_id": session_id,
             "user_id": context.user_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso or datetime.now().isoformat(),
             "topic": context.current_topic,
             "entities": context.entities_mentioned
         }
         
-        self.vector_store.add(
-            documents=[conversation_text],
-            metadatas=[metadata],
-            ids=[f"conversation_{context.session_id}_{datetime.now().timestamp()}"]
+        self._buffer_write(
+            conversation_text, metadata,
+            f"conversation_{session_id}_{next(self._doc_counter)}"
         )
     
+    def close_session(self, session_id: str):
+        """Drop cached per-session state once a session ends"""
+        with self._memory_lock:
+            self.conversation_memory.pop(session_id, None)
+        with self._pending_lock:
+            self._entity_hashes.pop(session_id, None)
+        with self._entity_index_lock:
+            self._session_entity_index.pop(session_id, None)
+            self._session_entity_automata.pop(session_id, None)
+    
     def query_cross_agent_context(self, query: str, current_agent: str, 
                                   session_id: str) -> Dict[str, Any]:
         """
@@ -65,41 +269,196 @@ class RAGKnowledgeBase:
             n_results=5
         )
         
+        # Identity lookup only - no body lock, so in-flight writes never block routing
+        slot = self.conversation_memory.get(session_id)
+        
         # Extract entities mentioned in query
         mentioned_entities = self.entity_resolver.extract_entities(query)
         
-        # Get resolved entity data
-        entity_data = {}
-        for entity in mentioned_entities:
-            resolved = self.entity_resolver.resolve_entity(entity, session_id)
-            if resolved:
-                entity_data[entity] = resolved
+        # Get resolved entity data - each distinct entity once, lookups fanned out
+        unique_entities = list(dict.fromkeys(mentioned_entities))
+        if len(unique_entities) > 1:
+            resolved_all = self._resolve_pool.map(
+                lambda entity: self.entity_resolver.resolve_entity(entity, session_id),
+                unique_entities
+            )
+        else:
+            resolved_all = [self.entity_resolver.resolve_entity(entity, session_id)
+                            for entity in unique_entities]
+        
+        entity_data = {
+            entity: resolved
+            for entity, resolved in zip(unique_entities, resolved_all)
+            if resolved
+        }
         
         return {
             "relevant_conversations": results,
             "mentioned_entities": mentioned_entities,
             "entity_data": entity_data,
-            "conversation_context": self.conversation_memory.get(session_id, {})
+            "conversation_context": (slot.body if slot else None) or {}
         }
     
     def update_entity_state(self, entity_type: str, entity_id: str, 
-                           data: Dict[str, Any], session_id: str):
+                           data: Dict[str, Any], session_id: str,
+                           now_iso: Optional[str] = None):
         """Update entity state across agents"""
         
-        # Store in vector database for semantic search
-        entity_text = f"{entity_type} {entity_id}: " + " ".join([f"{k}: {v}" for k, v in data.items()])
+        # Record the resolved entity in the session's memory
+        slot = self.conversation_memory.get(session_id)
+        if slot is not None:
+            with slot.body_lock:
+                if slot.body is not None:
+                    slot.body.resolved_entities[entity_id] = data
         
-        metadata = {
-            "entity_type": entity_type,
-            "entity_id": entity_id,
-            "session_id": session_id,
-            "timestamp": datetime.now().isoformat()
-        }
+        self._index_entity_names(entity_id, data, session_id)
+        
+        # Queue for the vector store; repeated updates within a turn keep only the latest data
+        entity_type = sys.intern(entity_type)  # tiny enumeration - share one string object
+        with self._pending_lock:
+            self._pending_entities[(entity_type, entity_id, session_id)] = (data, now_iso)
+    
+    def _index_entity_names(self, entity_id: str, data: Dict[str, Any], session_id: str):
+        """Register the entity's names for single-pass matching in later messages"""
+        
+        first = (data.get("first_name") or "").strip()
+        last = (data.get("last_name") or "").strip()
+        names = {first, f"{first} {last}".strip(), (data.get("name") or "").strip()}
+        names = {name.lower() for name in names if name}
+        if not names:
+            return
+        
+        with self._entity_index_lock:
+            index = self._session_entity_index.setdefault(session_id, {})
+            for name in names:
+                index[name] = (entity_id, data)
+            
+            if AHOCORASICK_AVAILABLE:
+                automaton = self._session_entity_automata.get(session_id)
+                if automaton is None:
+                    automaton = self._session_entity_automata[session_id] = ahocorasick.Automaton()
+                for name in names:
+                    automaton.add_word(name, (len(name), name))
+                automaton.make_automaton()
+    
+    def match_known_entities(self, session_id: str,
+                             text_lower: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Return (entity_id, data) for every known session entity named in the text"""
+        
+        with self._entity_index_lock:
+            index = self._session_entity_index.get(session_id)
+            if not index:
+                return []
+            index = dict(index)
+            automaton = self._session_entity_automata.get(session_id)
+        
+        if automaton is not None:
+            found = (name for end, (length, name) in automaton.iter(text_lower)
+                     if _on_word_boundary(text_lower, end - length + 1, end + 1))
+        else:
+            found = (name for name in index
+                     if any(_on_word_boundary(text_lower, match.start(), match.end())
+                            for match in re.finditer(re.escape(name), text_lower)))
+        
+        hits = {}
+        for name in found:
+            entity_id, data = index[name]
+            hits.setdefault(entity_id, data)
+        return list(hits.items())
+    
+    def flush_entities(self, session_id: str):
+        """Write the session's pending entity updates in one batch"""
+        
+        with self._pending_lock:
+            keys = [key for key in self._pending_entities if key[2] == session_id]
+            pending = [(key, self._pending_entities.pop(key)) for key in keys]
+            written = dict(self._entity_hashes.get(session_id, ()))
+        
+        if not pending:
+            return
+        
+        fallback_ts = datetime.now().isoformat()
+        batch = []
+        digests = {}
+        for (entity_type, entity_id, _), (data, now_iso) in pending:
+            doc_id = f"entity_{entity_type}_{entity_id}_{session_id}"
+            
+            # Byte-identical data is already embedded - skip the write
+            digest = hashlib.blake2b(_canonical_json(data), digest_size=16).digest()
+            if written.get(doc_id) == digest:
+                continue
+            digests[doc_id] = digest
+            
+            entity_text = " ".join(itertools.chain(
+                (f"{entity_type} {entity_id}:",),
+                (f"{k}: {v}" for k, v in data.items())
+            ))
+            metadata = {
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "session_id": session_id,
+                "timestamp": now_iso or fallback_ts
+            }
+            batch.append((entity_text, metadata, doc_id))
+        
+        if not batch:
+            return
+        
+        try:
+            self._write_batch(batch)
+        except Exception:
+            # Put the updates back for the next flush unless newer data replaced them
+            with self._pending_lock:
+                for key, value in pending:
+                    self._pending_entities.setdefault(key, value)
+            raise
+        
+        # Only data that reached the vector store counts as written
+        with self._pending_lock:
+            self._entity_hashes.setdefault(session_id, {}).update(digests)
+    
+    def _buffer_write(self, document: str, metadata: Dict[str, Any], doc_id: str):
+        """Queue a vector store write; full batches go to the background worker"""
         
+        batch = None
+        with self._buf_lock:
+            self._write_buf.append((document, metadata, doc_id))
+            
+            if len(self._write_buf) >= self.WRITE_BATCH_SIZE:
+                batch = self._write_buf
+                self._write_buf = []
+                if self._flush_timer:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.WRITE_FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        
+        if batch:
+            self._rag_queue.put_nowait((self._write_batch, (batch,)))
+    
+    def flush(self):
+        """Write all buffered documents to the vector store"""
+        
+        with self._buf_lock:
+            batch = self._write_buf
+            self._write_buf = []
+            if self._flush_timer:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        
+        if batch:
+            self._write_batch(batch)
+    
+    def _write_batch(self, batch: List[tuple]):
+        """Send one batched add to the vector store"""
+        
+        documents, metadatas, ids = zip(*batch)
         self.vector_store.add(
-            documents=[entity_text],
-            metadatas=[metadata],
-            ids=[f"entity_{entity_type}_{entity_id}_{session_id}"]
+            documents=list(documents),
+            metadatas=list(metadatas),
+            ids=list(ids)
         )
 
 class EntityResolver:
@@ -107,27 +466,63 @@ class EntityResolver:
     Resolves entity references across conversation context
     Example: "john" → user_id_123, "that user" → last mentioned user
     """
+    __slots__ = ()
     
     def extract_entities(self, text: str) -> List[str]:
         """Extract entity references from text"""
         
-        entities = []
-        
         # Names (potential user references)
-        import re
-        names = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', text)
-        entities.extend(names)
+        entities = _NAME_RE.findall(text)
         
-        # Pronouns and references
-        references = re.findall(r'\b(?:that user|this user|him|her|they|that service|this service)\b', text, re.IGNORECASE)
-        entities.extend(references)
+        # Pronouns and references, then service names
+        references, services = self._scan_vocabulary(text)
         
-        # Service names
-        services = re.findall(r'\b(?:room service|housekeeping|maintenance|wifi|ac)\b', text, re.IGNORECASE)
+        entities.extend(references)
         entities.extend(services)
         
         return entities
     
+    def _scan_vocabulary(self, text: str) -> Tuple[List[str], List[str]]:
+        """Find reference and service terms in one pass over the text"""
+        
+        references = []
+        services = []
+        text_lower = text.lower()
+        
+        # Case mapping can change string length for some characters -
+        # only then fall back to the regex scan
+        text_len = len(text)
+        add_reference = references.append
+        add_service = services.append
+        if _VOCAB_AUTOMATON is None or len(text_lower) != text_len:
+            for match in _REF_SVC_RE.finditer(text):
+                if match.lastgroup == "ref":
+                    add_reference(match.group())
+                else:
+                    add_service(match.group())
+            return references, services
+        
+        # Keep leftmost, non-overlapping hits on word boundaries (regex semantics)
+        hits = []
+        add_hit = hits.append
+        is_word_char = _is_word_char
+        for end, (kind, length) in _VOCAB_AUTOMATON.iter(text_lower):
+            start = end - length + 1
+            if start > 0 and is_word_char(text[start - 1]):
+                continue
+            if end + 1 < text_len and is_word_char(text[end + 1]):
+                continue
+            add_hit((start, -length, kind))
+        
+        last_end = 0
+        for start, neg_length, kind in sorted(hits):
+            if start < last_end:
+                continue
+            last_end = start - neg_length
+            (add_reference if kind == "ref" else add_service)(text[start:last_end])
+        
+        return references, services
+    
     def resolve_entity(self, entity: str, session_id: str) -> Optional[Dict[str, Any]]:
         """Resolve entity reference to actual data"""
         
@@ -140,9 +535,10 @@ class RAGEnhancedAgent:
     Base class for agents with RAG integration
     All agents inherit shared context awareness
     """
+    __slots__ = ("agent_name", "rag_kb")
     
     def __init__(self, agent_name: str, rag_kb: RAGKnowledgeBase):
-        self.agent_name = agent_name
+        self.agent_name = sys.intern(agent_name)  # small fixed set of agent names
         self.rag_kb = rag_kb
     
     def process_with_context(self, message: str, session_state: Dict) -> Dict[str, Any]:
@@ -156,8 +552,12 @@ class RAGEnhancedAgent:
         # 2. Process with enhanced context
         response = self._process_message_with_context(message, context, session_state)
         
-        # 3. Update shared knowledge
-        self._update_shared_knowledge(message, response, session_state)
+        # 3. Update shared knowledge (one timestamp for the whole turn)
+        self._update_shared_knowledge(message, response, session_state,
+                                      now_iso=datetime.now().isoformat())
+        
+        # 4. Turn is over - write the coalesced entity updates
+        self.rag_kb.flush_entities(session_state["session_id"])
         
         return response
     
@@ -166,23 +566,32 @@ class RAGEnhancedAgent:
         """Override in each agent"""
         pass
     
+    def shutdown(self):
+        """Store queued contexts and flush pending knowledge base writes"""
+        self.rag_kb.drain()
+    
     def _update_shared_knowledge(self, message: str, response: Dict, 
-                                session_state: Dict):
+                                session_state: Dict, now_iso: Optional[str] = None):
         """Update RAG knowledge base with new information"""
         
+        rag_kb = self.rag_kb
+        history = MessageLog()
+        history.append("user", message)
+        history.append("assistant", response.get("response", ""))
+        
         # Store conversation context
         conv_context = ConversationContext(
             session_id=session_state["session_id"],
             user_id=session_state["user_id"],
             current_topic=self.agent_name,
-            entities_mentioned=self.rag_kb.entity_resolver.extract_entities(message),
-            conversation_history=[{"role": "user", "content": message}, 
-                                {"role": "assistant", "content": response.get("response", "")}],
+            entities_mentioned=rag_kb.entity_resolver.extract_entities(message),
+            conversation_history=history,
             active_operations=session_state.get("active_operations", []),
             resolved_entities={}
         )
         
-        self.rag_kb.store_conversation_context(conv_context)
+        # Stored by the knowledge base worker - the response doesn't wait on embedding
+        rag_kb.enqueue_context(conv_context, now_iso)
 
 # IMPLEMENTATION EXAMPLE:
 
@@ -193,13 +602,15 @@ class RAGUserManagementAgent(RAGEnhancedAgent):
                                      session_state: Dict) -> Dict[str, Any]:
         
         # Check if user is referencing previously mentioned entities
-        if "john" in message.lower() and context["entity_data"]:
-            john_data = context["entity_data"].get("john")
-            if john_data:
-                return {
-                    "response": f"I found John {john_data['last_name']} in our system. What would you like to do with his account?",
-                    "entity_context": john_data
-                }
+        message_lower = message.lower()
+        hits = self.rag_kb.match_known_entities(session_state["session_id"], message_lower)
+        if hits:
+            entity_id, entity = hits[0]
+            full_name = " ".join(filter(None, (entity.get("first_name"), entity.get("last_name"))))
+            return {
+                "response": f"I found {full_name or entity_id} in our system. What would you like to do with their account?",
+                "entity_context": entity
+            }
         
         # Normal user management processing...
         return self._create_user_normally(message, session_state)
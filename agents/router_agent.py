@@ -11,16 +11,145 @@ The Router Agent is the entry point for all conversations. It:
 
 import re
 import json
+import hashlib
+from collections import deque
+from dataclasses import dataclass
+from operator import itemgetter
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 
 from .state_schema import (
-    ChatState, AgentType, IntentType, ConversationState,
+    ChatState, AgentType, IntentType, ConversationState, HISTORY_MAXLEN,
     set_active_agent, transition_conversation_state, 
     add_message_to_state, log_error_to_state
 )
 from llm_utils import ask_gemini
 from logger_config import agent_logger, log_action, log_error
+from efficiency.simple_optimizations import ResponseCache, efficiency_optimizer
+
+# Routing-result cache (optional) - resolved once instead of on every message
+try:
+    from improvements.simple_flow_enhancer import flow_enhancer
+except ImportError:
+    flow_enhancer = None
+
+# Try to import Aho-Corasick multi-pattern matcher (optional)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Try to import diskcache to persist LLM classifications across restarts (optional)
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+# Try to import orjson for faster parsing (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Structured-data detectors (email, phone, capitalized full name) in one scan.
+# Each sits in its own optional lookahead, so overlapping hits are all reported.
+_STRUCT_RE = re.compile(
+    r'(?:(?=[\s\S]*?(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)))?'
+    r'(?:(?=[\s\S]*?(?P<phone>\b\d{3}[-.]?\d{3}[-.]?\d{4}\b)))?'
+    r'(?:(?=[\s\S]*?(?P<name>\b[A-Z][a-z]+\s+[A-Z][a-z]+\b)))?'
+)
+
+# Intent -> (agent, conversation state to enter) routing table.
+# User creation stays idle - the user management agent picks the state from the data it has.
+_ROUTING_TABLE = {
+    IntentType.USER_CREATE: (AgentType.USER_MANAGEMENT, ConversationState.IDLE),
+    IntentType.USER_UPDATE: (AgentType.USER_MANAGEMENT, ConversationState.DATA_COLLECTION),
+    IntentType.USER_DELETE: (AgentType.USER_MANAGEMENT, ConversationState.CONFIRMATION_PENDING),
+    IntentType.USER_LIST: (AgentType.USER_MANAGEMENT, ConversationState.OPERATION_EXECUTION),
+    IntentType.USER_SEARCH: (AgentType.USER_MANAGEMENT, ConversationState.OPERATION_EXECUTION),
+    
+    IntentType.SERVICE_ADD: (AgentType.SERVICE_MANAGEMENT, ConversationState.DATA_COLLECTION),
+    IntentType.SERVICE_LIST: (AgentType.SERVICE_MANAGEMENT, ConversationState.OPERATION_EXECUTION),
+    
+    IntentType.KNOWLEDGE_QUERY: (AgentType.KNOWLEDGE_BASE, ConversationState.OPERATION_EXECUTION),
+    IntentType.TROUBLESHOOTING: (AgentType.KNOWLEDGE_BASE, ConversationState.OPERATION_EXECUTION),
+    
+    IntentType.HANDOFF_REQUEST: (AgentType.CONVERSATION_MANAGER, ConversationState.HUMAN_HANDOFF),
+    IntentType.GREETING: (AgentType.CONVERSATION_MANAGER, ConversationState.OPERATION_EXECUTION),
+    IntentType.UNCLEAR: (AgentType.CONVERSATION_MANAGER, ConversationState.OPERATION_EXECUTION)
+}
+# Unknown or missing intents
+_DEFAULT_ROUTE = (AgentType.CONVERSATION_MANAGER, ConversationState.OPERATION_EXECUTION)
+
+# JSON object inside a ``` or ```json fence in an LLM reply
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.S)
+
+# Words for context-clue lookup
+_CLUE_TOKEN_RE = re.compile(r"[a-z]+")
+
+# Speaker labels for the LLM context block
+_ROLE_TITLE = {"user": "User", "assistant": "Assistant", "system": "System"}
+_CONTEXT_PREVIEW_LEN = 100
+
+_INTENT_BY_VALUE = {intent.value: intent for intent in IntentType}
+_INTENT_OPTIONS = ", ".join(_INTENT_BY_VALUE)
+
+# Whole-message shortcut for greetings and handoff requests
+_SHORT_PHRASE_MAX_LEN = 20
+_SHORT_PHRASE_STRIP = ".,!? "
+
+def _char_mask(text: str) -> int:
+    """256-bit set of the characters in text (folded by code point, so only false positives)"""
+    mask = 0
+    for char in set(text):
+        mask |= 1 << (ord(char) & 0xFF)
+    return mask
+
+@dataclass(slots=True)
+class MessageFeatures:
+    """Per-message features shared by all heuristic classifiers - computed once"""
+    lower: str
+    tokens: frozenset
+    has_email: bool
+    has_phone: bool
+    has_comma: bool
+    has_name: bool
+    char_mask: int
+    
+    @classmethod
+    def from_message(cls, message: str, message_lower: str) -> "MessageFeatures":
+        structured = _STRUCT_RE.match(message)
+        return cls(
+            lower=message_lower,
+            tokens=frozenset(_CLUE_TOKEN_RE.findall(message_lower)),
+            has_email=structured.group("email") is not None,
+            has_phone=structured.group("phone") is not None,
+            has_comma="," in message,
+            has_name=structured.group("name") is not None,
+            char_mask=_char_mask(message_lower)
+        )
+
+def _trie_regex(words: List[str]) -> str:
+    """Build one alternation with shared prefixes factored out (a trie as a regex)"""
+    trie: Dict[str, Dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def build(node: Dict[str, Dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ends here - the rest of the branch is optional
+        return f"(?:{body})?" if "" in node else body
+    
+    return build(trie)
 
 class RouterAgent:
     """
@@ -30,9 +159,34 @@ class RouterAgent:
     
     def __init__(self):
         self.intent_patterns = self._initialize_intent_patterns()
+        self._kw_automaton = self._build_keyword_automaton() if AHOCORASICK_AVAILABLE else None
+        self._pattern_regex, self._pattern_groups = self._build_pattern_regex()
+        
+        # Whole-message greetings and handoff requests resolve without classification
+        self._short_phrases = {
+            keyword: intent
+            for intent in (IntentType.GREETING, IntentType.HANDOFF_REQUEST)
+            for keyword in self.intent_patterns[intent]["keywords"]
+        }
         self.confidence_threshold = 0.7
         self.min_confidence_for_routing = 0.5
         
+        # Stop running classifiers once the leader's raw score and margin reach these
+        self.early_exit_score = 0.85
+        self.early_exit_margin = 0.3
+        
+        # (message, conversation state, recent context) -> (intent, confidence, scores)
+        self._classification_cache = ResponseCache(max_size=4096)
+        
+        # Ids of the recent messages -> (lowercased joined text, tokens)
+        self._ctx_cache = ResponseCache(max_size=256)
+        
+        # Prompt digest -> parsed LLM classification
+        if DISKCACHE_AVAILABLE:
+            self._llm_cache = diskcache.Cache(".cache/router_llm")
+        else:
+            self._llm_cache = ResponseCache(max_size=1024)
+        
         # Performance tracking
         self.routing_stats = {
             "total_routes": 0,
@@ -46,7 +200,7 @@ class RouterAgent:
     def _initialize_intent_patterns(self) -> Dict[IntentType, Dict]:
         """Initialize comprehensive intent classification patterns"""
         
-        return {
+        intent_patterns = {
             # USER MANAGEMENT INTENTS
             IntentType.USER_CREATE: {
                 "keywords": [
@@ -219,6 +373,51 @@ class RouterAgent:
                 "weight": 1.0
             }
         }
+        
+        # Compile once - the classifier runs every pattern on every message
+        for config in intent_patterns.values():
+            config["patterns"] = [re.compile(p, re.IGNORECASE) for p in config["patterns"]]
+            # One trie-shaped search tells whether any keyword of the intent is present
+            config["keyword_regex"] = re.compile(_trie_regex(config["keywords"]))
+            # A keyword can only occur if the message has all of its characters
+            config["keyword_masks"] = tuple({_char_mask(keyword) for keyword in config["keywords"]})
+            # Single-word clues are checked against a token set, phrases by substring
+            clues = config.get("context_clues", [])
+            config["clue_words"] = [clue for clue in clues if " " not in clue]
+            config["clue_phrases"] = [clue for clue in clues if " " in clue]
+        
+        return intent_patterns
+    
+    def _build_keyword_automaton(self):
+        """One automaton over every intent's keywords, each tagged with the intents using it"""
+        
+        keyword_intents: Dict[str, List[IntentType]] = {}
+        for intent, config in self.intent_patterns.items():
+            for keyword in config.get("keywords", []):
+                keyword_intents.setdefault(keyword, []).append(intent)
+        
+        automaton = ahocorasick.Automaton()
+        for keyword, intents in keyword_intents.items():
+            automaton.add_word(keyword, (keyword, tuple(intents)))
+        automaton.make_automaton()
+        return automaton
+    
+    def _build_pattern_regex(self) -> Tuple["re.Pattern", List[Tuple[str, IntentType]]]:
+        """
+        Fold every intent pattern into one regex. Each pattern sits in its own optional
+        lookahead from the start of the message, so a single match() reports every
+        pattern that an individual search() would find.
+        """
+        
+        groups = []
+        parts = []
+        for intent, config in self.intent_patterns.items():
+            for i, pattern in enumerate(config.get("patterns", [])):
+                name = f"{intent.name}_{i}"
+                groups.append((name, intent))
+                parts.append(f"(?:(?=[\\s\\S]*?(?P<{name}>{pattern.pattern})))?")
+        
+        return re.compile("".join(parts), re.IGNORECASE), groups
     
     def process_message(self, state: ChatState, message: str) -> ChatState:
         """
@@ -237,8 +436,6 @@ class RouterAgent:
         try:
             # EFFICIENCY OPTIMIZATION - Skip API for obvious cases
             try:
-                from efficiency.simple_optimizations import efficiency_optimizer
-                
                 # Try lightning-fast routing first
                 fast_result = efficiency_optimizer.fast_route(message)
                 if fast_result:
@@ -247,13 +444,13 @@ class RouterAgent:
                               session_id=state["session_id"])
                     
                     # Create optimized state without API call
-                    optimized_state = state.copy()
-                    optimized_state["active_agent"] = fast_result["agent"]
-                    optimized_state["current_intent"] = "fast_routed"
-                    optimized_state["intent_confidence"] = fast_result["confidence"]
-                    optimized_state["api_saved"] = True
-                    
-                    return optimized_state
+                    return {
+                        **state,
+                        "active_agent": fast_result["agent"],
+                        "current_intent": "fast_routed",
+                        "intent_confidence": fast_result["confidence"],
+                        "api_saved": True
+                    }
                 
                 # Check conversation flow optimization
                 current_agent = state.get("active_agent", "conversation_manager")
@@ -263,16 +460,18 @@ class RouterAgent:
                               f"🔄 Flow continuation: {message} → {flow_agent}", 
                               session_id=state["session_id"])
                     
-                    optimized_state = state.copy()
-                    optimized_state["active_agent"] = flow_agent
-                    optimized_state["current_intent"] = "flow_continuation"
-                    optimized_state["intent_confidence"] = 0.9
-                    optimized_state["api_saved"] = True
-                    
-                    return optimized_state
+                    return {
+                        **state,
+                        "active_agent": flow_agent,
+                        "current_intent": "flow_continuation",
+                        "intent_confidence": 0.9,
+                        "api_saved": True
+                    }
                     
-            except (ImportError, Exception):
-                pass  # Efficiency optimization not available, continue with normal routing
+            except Exception as e:
+                # Continue with normal routing, but don't hide the failure
+                log_error("FAST_ROUTE_ERROR", f"Efficiency routing failed: {e}", 
+                         session_id=state["session_id"])
             
             # Add user message to state
             updated_state = add_message_to_state(
@@ -293,11 +492,12 @@ class RouterAgent:
             routed_state = self._route_to_agent(updated_state, intent_result)
             
             # Cache this API result for future use
-            try:
-                from improvements.simple_flow_enhancer import flow_enhancer
-                flow_enhancer.cache_api_result(message, routed_state)
-            except (ImportError, Exception):
-                pass  # Caching not available
+            if flow_enhancer is not None:
+                try:
+                    flow_enhancer.cache_api_result(message, routed_state)
+                except Exception as e:
+                    log_error("ROUTE_CACHE_ERROR", f"Caching routing result failed: {e}", 
+                             session_id=state["session_id"])
             
             # Log routing decision
             intent_name = intent.value if intent else 'None'
@@ -354,17 +554,52 @@ class RouterAgent:
         
         message_lower = message.lower().strip()
         
-        # Method 1: Pattern-based classification
-        pattern_results = self._pattern_based_classification(message_lower)
+        # Short messages that are exactly a greeting/handoff phrase ("hi", "escalate")
+        if len(message_lower) <= _SHORT_PHRASE_MAX_LEN:
+            short_intent = self._short_phrases.get(message_lower.strip(_SHORT_PHRASE_STRIP))
+            if short_intent:
+                agent_logger.info(f"Intent classification (short phrase): {short_intent.value}")
+                return {
+                    "intent": short_intent,
+                    "confidence": 1.0,
+                    "method": "short_phrase",
+                    "all_scores": {short_intent: 1.0}
+                }
+        
+        # Same message in the same state and context classifies the same way
+        cache_key = self._classification_cache_key(message_lower, state)
+        cached = self._classification_cache.get(cache_key)
+        if cached:
+            best_intent, confidence, combined_scores = cached
+            agent_logger.info(f"Intent classification (cached): {best_intent.value if best_intent else 'None'} "
+                             f"(confidence: {confidence:.2f})")
+            return {
+                "intent": best_intent,
+                "confidence": confidence,
+                "method": "hybrid",
+                "all_scores": dict(combined_scores)
+            }
+        
+        # One pass over the message for everything the heuristics need
+        feats = MessageFeatures.from_message(message, message_lower)
         
-        # Method 2: Keyword-based classification
-        keyword_results = self._keyword_based_classification(message_lower)
+        # Methods run cheap to expensive and stop once one intent clearly leads
+        pattern_results = keyword_results = context_results = {}
         
-        # Method 3: Context-aware classification
-        context_results = self._context_aware_classification(message_lower, state)
+        # Method 1: Structured data detection
+        structured_results = self._structured_data_classification(feats)
         
-        # Method 4: Structured data detection
-        structured_results = self._structured_data_classification(message)
+        # Method 2: Pattern-based classification
+        if not self._leads_decisively(structured_results):
+            pattern_results = self._pattern_based_classification(feats)
+        
+        # Method 3: Keyword-based classification
+        if not self._leads_decisively(structured_results, pattern_results):
+            keyword_results = self._keyword_based_classification(feats)
+        
+        # Method 4: Context-aware classification
+        if not self._leads_decisively(structured_results, pattern_results, keyword_results):
+            context_results = self._context_aware_classification(feats, state)
         
         # Combine results with weighted scoring
         combined_scores = self._combine_classification_results(
@@ -374,7 +609,8 @@ class RouterAgent:
         # Get best intent
         best_intent, confidence = self._get_best_intent(combined_scores)
         
-        # If confidence is low, use LLM for additional classification
+        # If confidence is low, use LLM for additional classification - only
+        # after all heuristics ran, so no quota is spent on messages they resolve
         if confidence < self.confidence_threshold:
             llm_result = self._llm_based_classification(message, state)
             if llm_result["confidence"] > confidence:
@@ -384,6 +620,10 @@ class RouterAgent:
         agent_logger.info(f"Intent classification: {best_intent.value if best_intent else 'None'} "
                          f"(confidence: {confidence:.2f})")
         
+        # Low-confidence results may come from a failed LLM call - retry those next time
+        if confidence >= self.min_confidence_for_routing:
+            self._classification_cache.set(cache_key, (best_intent, confidence, dict(combined_scores)))
+        
         return {
             "intent": best_intent,
             "confidence": confidence,
@@ -391,31 +631,64 @@ class RouterAgent:
             "all_scores": combined_scores
         }
     
-    def _pattern_based_classification(self, message: str) -> Dict[IntentType, float]:
-        """Classify intent using regex patterns"""
+    def _leads_decisively(self, *result_sets: Dict[IntentType, float]) -> bool:
+        """True if one intent's summed raw score is high and well ahead of the runner-up"""
         
-        scores = {}
+        totals: Dict[IntentType, float] = {}
+        for results in result_sets:
+            for intent, score in results.items():
+                totals[intent] = totals.get(intent, 0.0) + score
         
-        for intent, config in self.intent_patterns.items():
-            score = 0.0
-            pattern_matches = 0
-            
-            for pattern in config.get("patterns", []):
-                if re.search(pattern, message, re.IGNORECASE):
-                    pattern_matches += 1
-                    score += 0.3  # Each pattern match adds to score
-            
-            if pattern_matches > 0:
-                scores[intent] = min(score * config["weight"], 1.0)
+        # Leader and runner-up in one pass, no sorted copy
+        top = runner_up = 0.0
+        for score in totals.values():
+            if score > top:
+                top, runner_up = score, top
+            elif score > runner_up:
+                runner_up = score
         
-        return scores
+        return top >= self.early_exit_score and top - runner_up >= self.early_exit_margin
+    
+    def _classification_cache_key(self, message_lower: str, state: ChatState) -> str:
+        """Key on everything classification reads: message, conversation state, last 3 messages"""
+        
+        parts = [message_lower, str(state.get("conversation_state"))]
+        parts.extend(msg["content"] for msg in state["messages"][-3:])
+        return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
+    
+    def _pattern_based_classification(self, feats: MessageFeatures) -> Dict[IntentType, float]:
+        """Classify intent using regex patterns"""
+        
+        matched = self._pattern_regex.match(feats.lower)
+        raw_scores: Dict[IntentType, float] = {}
+        for name, intent in self._pattern_groups:
+            if matched.group(name) is not None:
+                raw_scores[intent] = raw_scores.get(intent, 0.0) + 0.3  # Each pattern match adds to score
+        
+        return {
+            intent: min(score * self.intent_patterns[intent]["weight"], 1.0)
+            for intent, score in raw_scores.items()
+        }
     
-    def _keyword_based_classification(self, message: str) -> Dict[IntentType, float]:
+    def _keyword_based_classification(self, feats: MessageFeatures) -> Dict[IntentType, float]:
         """Classify intent using keyword matching"""
         
+        message = feats.lower
+        if self._kw_automaton is not None:
+            return self._keyword_scan(message)
+        
         scores = {}
+        missing_chars = ~feats.char_mask
         
         for intent, config in self.intent_patterns.items():
+            # Bitmask test first: skip intents none of whose keywords fit the message's characters
+            if all(mask & missing_chars for mask in config["keyword_masks"]):
+                continue
+            
+            # Most intents have no keyword in the message - rule them out with one search
+            if not config["keyword_regex"].search(message):
+                continue
+            
             score = 0.0
             keyword_matches = 0
             
@@ -429,20 +702,44 @@ class RouterAgent:
         
         return scores
     
-    def _context_aware_classification(self, message: str, state: ChatState) -> Dict[IntentType, float]:
+    def _keyword_scan(self, message: str) -> Dict[IntentType, float]:
+        """Keyword scoring in a single Aho-Corasick pass over the message"""
+        
+        # Each keyword counts once per message, however often it occurs
+        seen = set()
+        raw_scores: Dict[IntentType, float] = {}
+        for _, (keyword, intents) in self._kw_automaton.iter(message):
+            if keyword in seen:
+                continue
+            seen.add(keyword)
+            for intent in intents:
+                raw_scores[intent] = raw_scores.get(intent, 0.0) + 0.2  # Each keyword match adds to score
+        
+        return {
+            intent: min(score * self.intent_patterns[intent]["weight"], 1.0)
+            for intent, score in raw_scores.items()
+        }
+    
+    def _context_aware_classification(self, feats: MessageFeatures, state: ChatState) -> Dict[IntentType, float]:
         """Classify intent based on conversation context"""
         
         scores = {}
+        message = feats.lower
         
         # Check for context clues in recent messages
-        recent_messages = state["messages"][-3:] if len(state["messages"]) > 3 else state["messages"]
-        context_text = " ".join([msg["content"] for msg in recent_messages])
+        context_text, context_tokens = self._recent_context(state["messages"][-3:])
+        
+        # Each single-word clue is a set lookup
+        tokens = context_tokens | feats.tokens
         
         for intent, config in self.intent_patterns.items():
             score = 0.0
             
-            for clue in config.get("context_clues", []):
-                if clue in message or clue in context_text.lower():
+            for clue in config["clue_words"]:
+                if clue in tokens:
+                    score += 0.1
+            for clue in config["clue_phrases"]:
+                if clue in message or clue in context_text:
                     score += 0.1
             
             # Boost score based on current conversation state
@@ -455,26 +752,38 @@ class RouterAgent:
         
         return scores
     
-    def _structured_data_classification(self, message: str) -> Dict[IntentType, float]:
+    def _recent_context(self, recent_messages: List[Dict]) -> Tuple[str, frozenset]:
+        """Lowercased text and word tokens of the recent messages, memoized by message ids"""
+        
+        # Message ids are unique, so the same ids always mean the same text
+        key = tuple(msg.get("id") for msg in recent_messages)
+        cacheable = None not in key
+        if cacheable:
+            cached = self._ctx_cache.get(key)
+            if cached:
+                return cached
+        
+        context_text = " ".join([msg["content"] for msg in recent_messages]).lower()
+        result = (context_text, frozenset(_CLUE_TOKEN_RE.findall(context_text)))
+        if cacheable:
+            self._ctx_cache.set(key, result)
+        return result
+    
+    def _structured_data_classification(self, feats: MessageFeatures) -> Dict[IntentType, float]:
         """Detect structured data patterns (like CSV-style input)"""
         
         scores = {}
         
-        # Check for email patterns (strong indicator of user data)
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        phone_pattern = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
-        
-        has_email = bool(re.search(email_pattern, message))
-        has_phone = bool(re.search(phone_pattern, message))
-        has_commas = ',' in message
+        # Email (strong indicator of user data), phone, commas and names come precomputed
+        has_email = feats.has_email
+        has_phone = feats.has_phone
         
         # Structured user data detection
-        if has_email and (has_commas or has_phone):
+        if has_email and (feats.has_comma or has_phone):
             scores[IntentType.USER_CREATE] = 0.9
         
         # Name patterns
-        name_pattern = r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b'
-        if re.search(name_pattern, message) and (has_email or has_phone):
+        if feats.has_name and (has_email or has_phone):
             scores[IntentType.USER_CREATE] = scores.get(IntentType.USER_CREATE, 0) + 0.3
         
         return scores
@@ -484,8 +793,6 @@ class RouterAgent:
         
         try:
             # Create classification prompt
-            intent_options = [intent.value for intent in IntentType]
-            
             prompt = f"""
             You are an expert at understanding user intent in a hotel management system. Classify this message accurately.
 
@@ -516,7 +823,7 @@ class RouterAgent:
             - Be intelligent about context - follow the conversation flow
             - Personal pronouns (he, she, his, her) usually indicate user data provision, not handoff requests
 
-            Available intents: {', '.join(intent_options)}
+            Available intents: {_INTENT_OPTIONS}
 
             Recent conversation context:
             {self._get_conversation_context(state)}
@@ -529,46 +836,39 @@ class RouterAgent:
             }}
             """
             
+            # The prompt holds the message and its context - same prompt, same classification
+            prompt_key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+            cached = self._llm_cache.get(prompt_key)
+            if cached:
+                return dict(cached)
+            
             response = ask_gemini(prompt)
             
             # Parse JSON response with better error handling
             try:
-                # Clean the response - sometimes LLM adds extra text
-                response_clean = response.strip()
-                
-                # Try to extract JSON if wrapped in markdown
-                if "```json" in response_clean:
-                    start = response_clean.find("```json") + 7
-                    end = response_clean.find("```", start)
-                    if end > start:
-                        response_clean = response_clean[start:end].strip()
-                elif "```" in response_clean:
-                    start = response_clean.find("```") + 3
-                    end = response_clean.find("```", start)
-                    if end > start:
-                        response_clean = response_clean[start:end].strip()
+                # Extract JSON if wrapped in markdown - sometimes LLM adds extra text
+                fence = _JSON_FENCE_RE.search(response)
+                response_clean = fence.group(1) if fence else response.strip()
                 
                 # Parse JSON
-                result = json.loads(response_clean)
+                result = orjson.loads(response_clean) if ORJSON_AVAILABLE else json.loads(response_clean)
                 intent_str = result.get("intent", "unclear")
                 confidence = float(result.get("confidence", 0.0))
                 
                 # Convert string to IntentType
-                intent = None
-                for intent_enum in IntentType:
-                    if intent_enum.value == intent_str:
-                        intent = intent_enum
-                        break
+                intent = _INTENT_BY_VALUE.get(intent_str)
                 
                 if not intent:
                     intent = IntentType.UNCLEAR
                     confidence = 0.0
                 
-                return {
+                classification = {
                     "intent": intent,
                     "confidence": confidence,
                     "reasoning": result.get("reasoning", "")
                 }
+                self._llm_cache.set(prompt_key, classification)
+                return dict(classification)
                 
             except (json.JSONDecodeError, ValueError) as e:
                 agent_logger.warning(f"Failed to parse LLM classification response: {e}")
@@ -593,19 +893,18 @@ class RouterAgent:
     def _combine_classification_results(self, *result_sets) -> Dict[IntentType, float]:
         """Combine multiple classification results with weighted scoring"""
         
-        combined_scores = {}
+        combined_scores: Dict[IntentType, float] = {}
+        get = combined_scores.get
         
         for results in result_sets:
             for intent, score in results.items():
-                if intent not in combined_scores:
-                    combined_scores[intent] = 0.0
-                combined_scores[intent] += score
+                combined_scores[intent] = get(intent, 0.0) + score
         
-        # Normalize scores
+        # Normalize scores in place
         max_score = max(combined_scores.values()) if combined_scores else 1.0
         if max_score > 0:
-            for intent in combined_scores:
-                combined_scores[intent] = min(combined_scores[intent] / max_score, 1.0)
+            for intent, score in combined_scores.items():
+                combined_scores[intent] = min(score / max_score, 1.0)
         
         return combined_scores
     
@@ -615,8 +914,7 @@ class RouterAgent:
         if not scores:
             return IntentType.UNCLEAR, 0.0
         
-        best_intent = max(scores.keys(), key=lambda k: scores[k])
-        confidence = scores[best_intent]
+        best_intent, confidence = max(scores.items(), key=itemgetter(1))
         
         # If confidence is too low, classify as unclear
         if confidence < self.min_confidence_for_routing:
@@ -630,28 +928,8 @@ class RouterAgent:
         intent = intent_result["intent"]
         confidence = intent_result["confidence"]
         
-        # Define agent routing rules - handle both enum and None cases
-        agent_routing = {}
-        if intent:
-            agent_routing = {
-                IntentType.USER_CREATE: AgentType.USER_MANAGEMENT,
-                IntentType.USER_UPDATE: AgentType.USER_MANAGEMENT,
-                IntentType.USER_DELETE: AgentType.USER_MANAGEMENT,
-                IntentType.USER_LIST: AgentType.USER_MANAGEMENT,
-                IntentType.USER_SEARCH: AgentType.USER_MANAGEMENT,
-                
-                IntentType.SERVICE_ADD: AgentType.SERVICE_MANAGEMENT,
-                IntentType.SERVICE_LIST: AgentType.SERVICE_MANAGEMENT,
-                
-                IntentType.KNOWLEDGE_QUERY: AgentType.KNOWLEDGE_BASE,
-                IntentType.TROUBLESHOOTING: AgentType.KNOWLEDGE_BASE,
-                
-                IntentType.HANDOFF_REQUEST: AgentType.CONVERSATION_MANAGER,
-                IntentType.GREETING: AgentType.CONVERSATION_MANAGER,
-                IntentType.UNCLEAR: AgentType.CONVERSATION_MANAGER
-            }
-        
-        target_agent = agent_routing.get(intent, AgentType.CONVERSATION_MANAGER)
+        # One lookup gives both the agent and the state to enter
+        target_agent, new_conv_state = _ROUTING_TABLE.get(intent, _DEFAULT_ROUTE)
         
         # Set active agent with routing context - store as string value
         updated_state = state.copy()
@@ -659,7 +937,7 @@ class RouterAgent:
         
         # Store routing metadata
         if "routing_history" not in updated_state:
-            updated_state["routing_history"] = []
+            updated_state["routing_history"] = deque(maxlen=HISTORY_MAXLEN)
         
         routing_entry = {
             "agent": target_agent.value,
@@ -672,40 +950,23 @@ class RouterAgent:
         updated_state["routing_history"].append(routing_entry)
         
         # Transition conversation state based on intent
-        new_conv_state = self._determine_conversation_state(intent)
-        updated_state["conversation_state"] = new_conv_state.value if hasattr(new_conv_state, 'value') else str(new_conv_state)
+        updated_state["conversation_state"] = new_conv_state.value
         
         return updated_state
     
     def _determine_conversation_state(self, intent: Optional[IntentType]) -> ConversationState:
         """Determine appropriate conversation state based on intent"""
         
-        # For user creation, let the agent determine the appropriate state based on available data
-        if intent == IntentType.USER_CREATE:
-            return ConversationState.IDLE  # Let user management agent handle state transition
-        elif intent in [IntentType.USER_UPDATE, IntentType.SERVICE_ADD]:
-            return ConversationState.DATA_COLLECTION
-        elif intent in [IntentType.USER_DELETE]:
-            return ConversationState.CONFIRMATION_PENDING
-        elif intent in [IntentType.KNOWLEDGE_QUERY, IntentType.TROUBLESHOOTING]:
-            return ConversationState.OPERATION_EXECUTION
-        elif intent == IntentType.HANDOFF_REQUEST:
-            return ConversationState.HUMAN_HANDOFF
-        else:
-            return ConversationState.OPERATION_EXECUTION
+        return _ROUTING_TABLE.get(intent, _DEFAULT_ROUTE)[1]
     
     def _get_conversation_context(self, state: ChatState) -> str:
         """Get formatted conversation context for LLM"""
         
-        recent_messages = state["messages"][-3:] if len(state["messages"]) > 3 else state["messages"]
-        
-        context_lines = []
-        for msg in recent_messages:
-            role = msg["role"].title()
-            content = msg["content"][:100] + "..." if len(msg["content"]) > 100 else msg["content"]
-            context_lines.append(f"{role}: {content}")
-        
-        return "\n".join(context_lines) if context_lines else "No previous context"
+        return "\n".join(
+            f"{_ROLE_TITLE.get(msg['role']) or msg['role'].title()}: "
+            f"{msg['content'] if len(msg['content']) <= _CONTEXT_PREVIEW_LEN else msg['content'][:_CONTEXT_PREVIEW_LEN] + '...'}"
+            for msg in state["messages"][-3:]
+        ) or "No previous context"
     
     def get_routing_stats(self) -> Dict:
         """Get router performance statistics"""
@@ -3,12 +3,19 @@ Simple RAG Knowledge Base for FAQ and Troubleshooting
 Focused implementation - no cross-agent complexity
 """
 
+import atexit
+import hashlib
+import heapq
 import json
 import os
-from typing import List, Dict, Optional, Tuple
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Iterable, List, Dict, Optional, Tuple
 from dataclasses import dataclass
 import sqlite3
 from datetime import datetime
+from efficiency.simple_optimizations import SemanticResponseCache
 
 # Try to import vector database (optional)
 try:
@@ -17,6 +24,91 @@ try:
 except ImportError:
     CHROMADB_AVAILABLE = False
 
+# Try to import orjson for faster parsing (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Try to import ijson for streaming large knowledge files (optional)
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Files above this size are streamed entry by entry instead of parsed whole
+_STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+# Try to import a local sentence encoder for batched embeddings (optional)
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+# Try to import FAISS for exact in-memory vector search (optional)
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+_EMBEDDING_BATCH_SIZE = 64
+
+# Keyword index tokens - underscores kept so tag names like "room_service" stay whole
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+# Keyword search weights per field
+_TITLE_WEIGHT = 3
+_TAG_WEIGHT = 2
+_CONTENT_WEIGHT = 1
+
+# HNSW construction/search parameters for a small, read-heavy FAQ collection
+_HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:M": 32,
+    "hnsw:search_ef": 64
+}
+
+_MANIFEST_FILE = "manifest_version"
+
+# Point at a running `chroma run` server to share one index across workers
+_CHROMA_HOST_ENV = "CHROMA_HOST"
+_CHROMA_PORT_ENV = "CHROMA_PORT"
+_CHROMA_DEFAULT_PORT = 8000
+
+# Rephrased queries at or above this cosine similarity reuse cached results
+# (only with a sentence-transformer; otherwise only exact repeats are reused)
+_QUERY_CACHE_THRESHOLD = 0.95
+_QUERY_CACHE_SIZE = 256
+
+# Common hotel/tech terms
+_TAG_KEYWORDS = {
+    'wifi': ['wifi', 'internet', 'connection', 'network'],
+    'ac': ['ac', 'air conditioning', 'hvac', 'temperature', 'cooling'],
+    'room_service': ['room service', 'dining', 'food', 'restaurant'],
+    'housekeeping': ['housekeeping', 'cleaning', 'maintenance'],
+    'login': ['login', 'password', 'account', 'access'],
+    'booking': ['booking', 'reservation', 'check-in', 'check-out'],
+    'payment': ['payment', 'billing', 'credit card', 'charge'],
+    'mobile': ['mobile', 'app', 'phone', 'smartphone']
+}
+_KEYWORD_TO_TAG = {keyword: tag for tag, keywords in _TAG_KEYWORDS.items() for keyword in keywords}
+# One pass over the text for every keyword, longest alternatives first
+_TAG_RE = re.compile(
+    r"\b(" + "|".join(re.escape(k) for k in sorted(_KEYWORD_TO_TAG, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=1024)
+def _query_tokens(query_lower: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN_RE.findall(query_lower))
+
 @dataclass
 class KnowledgeItem:
     id: str
@@ -34,23 +126,71 @@ class SimpleRAGKnowledge:
     - Easy to maintain
     """
     
-    def __init__(self, knowledge_dir: str = "knowledge"):
+    # Items per collection.add call
+    BATCH_SIZE = 200
+    
+    def __init__(self, knowledge_dir: str = "knowledge", quantize: bool = True):
         self.knowledge_dir = knowledge_dir
+        # Store FAISS vectors as int8 (4x smaller than float32)
+        self.quantize = quantize
         self.knowledge_items: List[KnowledgeItem] = []
         
-        # Initialize vector database if available
-        if CHROMADB_AVAILABLE:
-            self.chroma_client = chromadb.Client()
-            self.collection = self.chroma_client.create_collection(
+        # token -> [(item index, combined title/tag/content weight)]
+        self._inverted: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        
+        # Dynamic adds waiting for the next batched collection.add
+        self._pending_docs: List[str] = []
+        self._pending_meta: List[Dict] = []
+        self._pending_ids: List[str] = []
+        
+        # Exact inner-product index over normalized embeddings; row i is knowledge_items[i]
+        self.faiss_index = None
+        
+        # Initialize vector database if available. A FAQ-sized knowledge base
+        # fits a flat FAISS index that is rebuilt in milliseconds, so it is
+        # preferred over ChromaDB when a local encoder is available.
+        if FAISS_AVAILABLE and SENTENCE_TRANSFORMERS_AVAILABLE:
+            self.chroma_client = None
+            self.embedder = SentenceTransformer(_EMBEDDING_MODEL)
+            self.faiss_index = faiss.IndexFlatIP(self.embedder.get_sentence_embedding_dimension())
+        elif CHROMADB_AVAILABLE:
+            # Persisted so restarts reuse the index instead of re-embedding
+            self._chroma_path = os.path.join(self.knowledge_dir, ".chroma")
+            chroma_host = os.getenv(_CHROMA_HOST_ENV)
+            if chroma_host:
+                # Server mode: queries are HTTP calls that release the GIL, so
+                # concurrent sessions and worker processes no longer serialize
+                # on an in-process index
+                os.makedirs(self._chroma_path, exist_ok=True)
+                self.chroma_client = chromadb.HttpClient(
+                    host=chroma_host,
+                    port=int(os.getenv(_CHROMA_PORT_ENV, _CHROMA_DEFAULT_PORT))
+                )
+            else:
+                self.chroma_client = chromadb.PersistentClient(path=self._chroma_path)
+            # Documents are embedded here in batches rather than one by one inside Chroma
+            self.embedder = SentenceTransformer(_EMBEDDING_MODEL) if SENTENCE_TRANSFORMERS_AVAILABLE else None
+            self.collection = self.chroma_client.get_or_create_collection(
                 name="hotelops_knowledge",
-                get_or_create=True
+                metadata={**_HNSW_METADATA, "embedding_model": _EMBEDDING_MODEL if self.embedder else "chroma_default"}
             )
         else:
             self.chroma_client = None
+            self.embedder = None
             print("ChromaDB not available. Using keyword matching fallback.")
         
+        # Near-duplicate queries skip the vector database round-trip
+        self._query_cache = SemanticResponseCache(
+            embed_fn=self._query_embedder(),
+            threshold=_QUERY_CACHE_THRESHOLD,
+            max_size=_QUERY_CACHE_SIZE
+        )
+        
         # Load knowledge base
         self._load_knowledge_base()
+        
+        if self.chroma_client:
+            atexit.register(self.flush)
     
     def _load_knowledge_base(self):
         """Load FAQ and troubleshooting data"""
@@ -63,33 +203,66 @@ class SimpleRAGKnowledge:
         }
         
         all_items = []
+        manifest = hashlib.sha256()
+        # A different encoder means different vectors, so it forces a re-index too
+        manifest.update((_EMBEDDING_MODEL if self.embedder else "chroma_default").encode())
         
         for category, file_path in knowledge_files.items():
             if os.path.exists(file_path):
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                    if IJSON_AVAILABLE and os.path.getsize(file_path) > _STREAM_THRESHOLD_BYTES:
+                        # Only one top-level entry is held in memory at a time
+                        with open(file_path, 'rb') as f:
+                            for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+                                manifest.update(chunk)
+                        with open(file_path, 'rb') as f:
+                            items = self._parse_knowledge_entries(ijson.kvitems(f, ''), category)
+                    else:
+                        with open(file_path, 'rb') as f:
+                            raw = f.read()
+                        manifest.update(raw)
+                        data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
                         items = self._parse_knowledge_file(data, category)
-                        all_items.extend(items)
+                    all_items.extend(items)
                 except Exception as e:
                     print(f"Error loading {file_path}: {e}")
         
         self.knowledge_items = all_items
         
-        # Index in vector database
+        # Keyword index for the fallback search
+        self._inverted.clear()
+        for idx, item in enumerate(all_items):
+            self._index_keywords(idx, item)
+        
+        if self.faiss_index is not None:
+            self.faiss_index = self._build_faiss_index([item.content for item in all_items])
+        
+        # Index in vector database, unless the persisted collection already matches
         if self.chroma_client and all_items:
-            self._index_knowledge_items(all_items)
+            manifest_version = manifest.hexdigest()
+            if not self._collection_is_current(manifest_version, len(all_items)):
+                self._reset_collection()
+                self._index_knowledge_items(all_items)
+                self._write_manifest(manifest_version)
+        self.flush()
         
         print(f"Loaded {len(all_items)} knowledge items")
     
     def _parse_knowledge_file(self, data: Dict, category: str) -> List[KnowledgeItem]:
         """Parse knowledge file into standardized format"""
         
+        if not isinstance(data, dict):
+            return []
+        return self._parse_knowledge_entries(data.items(), category)
+    
+    def _parse_knowledge_entries(self, entries: Iterable[Tuple[str, Any]], category: str) -> List[KnowledgeItem]:
+        """Build knowledge items from a file's top-level (key, value) pairs"""
+        
         items = []
         
-        if category == "faq" and isinstance(data, dict):
+        if category == "faq":
             # FAQ format: {"question": "answer"}
-            for question, answer in data.items():
+            for question, answer in entries:
                 item = KnowledgeItem(
                     id=f"faq_{len(items)}",
                     title=question,
@@ -99,9 +272,9 @@ class SimpleRAGKnowledge:
                 )
                 items.append(item)
         
-        elif category == "troubleshooting" and isinstance(data, dict):
+        elif category == "troubleshooting":
             # Troubleshooting format: nested categories
-            for problem_category, problems in data.items():
+            for problem_category, problems in entries:
                 if isinstance(problems, dict):
                     for problem, solution in problems.items():
                         item = KnowledgeItem(
@@ -118,26 +291,103 @@ class SimpleRAGKnowledge:
     def _extract_tags(self, text: str) -> List[str]:
         """Extract relevant tags from text"""
         
-        # Common hotel/tech terms
-        tag_keywords = {
-            'wifi': ['wifi', 'internet', 'connection', 'network'],
-            'ac': ['ac', 'air conditioning', 'hvac', 'temperature', 'cooling'],
-            'room_service': ['room service', 'dining', 'food', 'restaurant'],
-            'housekeeping': ['housekeeping', 'cleaning', 'maintenance'],
-            'login': ['login', 'password', 'account', 'access'],
-            'booking': ['booking', 'reservation', 'check-in', 'check-out'],
-            'payment': ['payment', 'billing', 'credit card', 'charge'],
-            'mobile': ['mobile', 'app', 'phone', 'smartphone']
-        }
+        found = {_KEYWORD_TO_TAG[match.lower()] for match in _TAG_RE.findall(text)}
+        return [tag for tag in _TAG_KEYWORDS if tag in found]
+    
+    def _index_keywords(self, idx: int, item: KnowledgeItem):
+        """Add one item's title, content and tag tokens to the inverted index"""
+        
+        title_tokens = set(_TOKEN_RE.findall(item.title.lower()))
+        content_tokens = set(_TOKEN_RE.findall(item.content.lower()))
+        tag_tokens = {tag.lower() for tag in item.tags}
+        
+        for token in title_tokens | content_tokens | tag_tokens:
+            weight = ((_TITLE_WEIGHT if token in title_tokens else 0) +
+                      (_TAG_WEIGHT if token in tag_tokens else 0) +
+                      (_CONTENT_WEIGHT if token in content_tokens else 0))
+            self._inverted[token].append((idx, weight))
+    
+    def _encode(self, documents: List[str]):
+        """Normalized float32 embeddings for documents, encoded in one batched call"""
+        
+        return self.embedder.encode(
+            documents,
+            batch_size=_EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+    
+    def _build_faiss_index(self, documents: List[str]):
+        """Flat inner-product index over the documents, int8-quantized when enabled"""
         
-        text_lower = text.lower()
-        tags = []
+        dimension = self.embedder.get_sentence_embedding_dimension()
+        if not documents:
+            return faiss.IndexFlatIP(dimension)
         
-        for tag, keywords in tag_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                tags.append(tag)
+        embeddings = self._encode(documents)
+        if self.quantize:
+            # The quantizer learns per-dimension ranges from the initial corpus
+            index = faiss.IndexScalarQuantizer(
+                dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(embeddings)
+        else:
+            index = faiss.IndexFlatIP(dimension)
+        index.add(embeddings)
+        return index
+    
+    def _embed_documents(self, documents: List[str]) -> Optional[List[List[float]]]:
+        """Embed documents in one batched call, or None to let Chroma embed them"""
+        
+        if not self.embedder:
+            return None
+        return self._encode(documents).tolist()
+    
+    def _query_embedder(self):
+        """
+        Embed queries with the same encoder as the indexed documents.
+        None without a sentence-transformer - the cache then only reuses exact repeats
+        """
+        
+        if self.embedder:
+            return lambda text: self._embed_documents([text])[0]
+        return None
+    
+    def _collection_is_current(self, manifest_version: str, item_count: int) -> bool:
+        """Whether the persisted collection was built from the same knowledge files"""
+        
+        try:
+            if self.collection.count() != item_count:
+                return False
+            with open(os.path.join(self._chroma_path, _MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                return f.read().strip() == manifest_version
+        except Exception:
+            return False
+    
+    def _write_manifest(self, manifest_version: str):
+        try:
+            with open(os.path.join(self._chroma_path, _MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                f.write(manifest_version)
+        except Exception as e:
+            print(f"Error writing knowledge manifest: {e}")
+    
+    def _reset_collection(self):
+        """Drop stale documents before a full re-index"""
         
-        return tags
+        try:
+            if self.collection.count():
+                self.collection.delete(ids=self.collection.get(include=[])["ids"])
+        except Exception as e:
+            print(f"Error clearing knowledge index: {e}")
+    
+    @staticmethod
+    def _item_metadata(item: KnowledgeItem) -> Dict:
+        return {
+            "id": item.id,
+            "title": item.title,
+            "category": item.category,
+            "tags": ",".join(item.tags)
+        }
     
     def _index_knowledge_items(self, items: List[KnowledgeItem]):
         """Index items in vector database"""
@@ -146,96 +396,154 @@ class SimpleRAGKnowledge:
             return
         
         documents = [item.content for item in items]
-        metadatas = [{
-            "id": item.id,
-            "title": item.title,
-            "category": item.category,
-            "tags": ",".join(item.tags)
-        } for item in items]
+        metadatas = [self._item_metadata(item) for item in items]
         ids = [item.id for item in items]
         
+        batch_size = self.BATCH_SIZE
+        try:
+            embeddings = self._embed_documents(documents)
+            for i in range(0, len(documents), batch_size):
+                self.collection.add(
+                    documents=documents[i:i + batch_size],
+                    embeddings=embeddings[i:i + batch_size] if embeddings else None,
+                    metadatas=metadatas[i:i + batch_size],
+                    ids=ids[i:i + batch_size]
+                )
+        except Exception as e:
+            print(f"Error indexing knowledge: {e}")
+    
+    def flush(self):
+        """Write any buffered dynamic adds to the vector database in one call"""
+        
+        if not self._pending_ids:
+            return
+        
+        documents, metadatas, ids = self._pending_docs, self._pending_meta, self._pending_ids
+        self._pending_docs, self._pending_meta, self._pending_ids = [], [], []
+        
         try:
             self.collection.add(
                 documents=documents,
+                embeddings=self._embed_documents(documents),
                 metadatas=metadatas,
                 ids=ids
             )
         except Exception as e:
-            print(f"Error indexing knowledge: {e}")
+            print(f"Error adding to vector DB: {e}")
     
     def search_knowledge(self, query: str, max_results: int = 3) -> List[Dict]:
         """
         Search knowledge base for relevant information
         """
         
-        if self.chroma_client:
-            return self._vector_search(query, max_results)
-        else:
+        if self.faiss_index is None and not self.chroma_client:
             return self._keyword_search(query, max_results)
+        
+        bucket = str(max_results)
+        embedding = self._query_cache.embed(query)
+        if embedding is not None:
+            cached = self._query_cache.get("knowledge", bucket, embedding)
+            if cached:
+                return list(cached["results"])
+        
+        if self.faiss_index is not None:
+            results = self._faiss_search(query, max_results)
+        else:
+            results = self._vector_search(query, max_results)
+        if embedding is not None and results:
+            self._query_cache.set("knowledge", bucket, embedding, {"results": results})
+        return list(results)
     
     def _vector_search(self, query: str, max_results: int) -> List[Dict]:
         """Semantic search using vector database"""
         
+        # Buffered adds must be visible to the query
+        self.flush()
+        
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=max_results
-            )
+            if self.embedder:
+                results = self.collection.query(
+                    query_embeddings=self._embed_documents([query]),
+                    n_results=max_results
+                )
+            else:
+                results = self.collection.query(
+                    query_texts=[query],
+                    n_results=max_results
+                )
             
-            formatted_results = []
+            if not results['documents']:
+                return []
             
-            if results['documents']:
-                for i, doc in enumerate(results['documents'][0]):
-                    metadata = results['metadatas'][0][i]
-                    distance = results['distances'][0][i] if 'distances' in results else 0
-                    
-                    formatted_results.append({
-                        "title": metadata.get("title", ""),
-                        "content": doc,
-                        "category": metadata.get("category", ""),
-                        "relevance_score": 1 - distance,  # Convert distance to relevance
-                        "tags": metadata.get("tags", "").split(",") if metadata.get("tags") else []
-                    })
+            # Single query, so only the first row of each result field matters
+            docs = results['documents'][0]
+            metadatas = results['metadatas'][0]
+            distances = results['distances'][0] if results.get('distances') else [0] * len(docs)
             
-            return formatted_results
+            return [{
+                "title": metadata.get("title", ""),
+                "content": doc,
+                "category": metadata.get("category", ""),
+                "relevance_score": 1 - distance,  # Convert distance to relevance
+                "tags": metadata["tags"].split(",") if metadata.get("tags") else []
+            } for doc, metadata, distance in zip(docs, metadatas, distances)]
             
         except Exception as e:
             print(f"Vector search error: {e}")
             return self._keyword_search(query, max_results)
     
-    def _keyword_search(self, query: str, max_results: int) -> List[Dict]:
-        """Fallback keyword-based search"""
+    def _faiss_search(self, query: str, max_results: int) -> List[Dict]:
+        """Exact cosine search over the in-memory FAISS index"""
         
-        query_lower = query.lower()
-        scored_items = []
-        
-        for item in self.knowledge_items:
-            score = 0
-            content_lower = item.content.lower()
-            title_lower = item.title.lower()
-            
-            # Score based on keyword matches
-            query_words = query_lower.split()
-            for word in query_words:
-                if word in title_lower:
-                    score += 3  # Title matches are more important
-                if word in content_lower:
-                    score += 1
-                if word in [tag.lower() for tag in item.tags]:
-                    score += 2  # Tag matches are important
+        try:
+            scores, rows = self.faiss_index.search(self._encode([query]), max_results)
             
-            if score > 0:
-                scored_items.append({
+            formatted_results = []
+            for score, row in zip(scores[0], rows[0]):
+                if row < 0:  # fewer items than max_results
+                    continue
+                item = self.knowledge_items[row]
+                formatted_results.append({
                     "title": item.title,
                     "content": item.content,
                     "category": item.category,
-                    "relevance_score": score / len(query_words),  # Normalize score
+                    "relevance_score": float(score),  # Cosine similarity
                     "tags": item.tags
                 })
+            
+            return formatted_results
+            
+        except Exception as e:
+            print(f"Vector search error: {e}")
+            return self._keyword_search(query, max_results)
+    
+    def _keyword_search(self, query: str, max_results: int) -> List[Dict]:
+        """Fallback keyword-based search"""
+        
+        query_words = _query_tokens(query.lower())
+        if not query_words:
+            return []
         
-        # Sort by score and return top results
-        scored_items.sort(key=lambda x: x['relevance_score'], reverse=True)
-        return scored_items[:max_results]
+        # Only items sharing a token with the query are ever touched
+        scores: Dict[int, int] = defaultdict(int)
+        for word in query_words:
+            for idx, weight in self._inverted.get(word, ()):
+                scores[idx] += weight
+        
+        # Top results, ties in knowledge-base order
+        top = heapq.nlargest(max_results, scores.items(), key=lambda entry: (entry[1], -entry[0]))
+        
+        results = []
+        for idx, score in top:
+            item = self.knowledge_items[idx]
+            results.append({
+                "title": item.title,
+                "content": item.content,
+                "category": item.category,
+                "relevance_score": score / len(query_words),  # Normalize score
+                "tags": item.tags
+            })
+        return results
     
     def get_category_items(self, category: str) -> List[Dict]:
         """Get all items from a specific category"""
@@ -259,22 +567,24 @@ class SimpleRAGKnowledge:
         )
         
         self.knowledge_items.append(item)
+        self._index_keywords(len(self.knowledge_items) - 1, item)
+        self._query_cache.clear()
         
-        # Add to vector database
-        if self.chroma_client:
+        if self.faiss_index is not None:
             try:
-                self.collection.add(
-                    documents=[content],
-                    metadatas=[{
-                        "id": item.id,
-                        "title": title,
-                        "category": category,
-                        "tags": ",".join(tags or [])
-                    }],
-                    ids=[item.id]
-                )
+                self.faiss_index.add(self._encode([content]))
             except Exception as e:
-                print(f"Error adding to vector DB: {e}")
+                # Rows would no longer line up with knowledge_items
+                print(f"Error adding to vector index: {e}. Falling back to keyword search.")
+                self.faiss_index = None
+        
+        # Buffer for the vector database, written once a batch fills up
+        if self.chroma_client:
+            self._pending_docs.append(content)
+            self._pending_meta.append(self._item_metadata(item))
+            self._pending_ids.append(item.id)
+            if len(self._pending_ids) >= self.BATCH_SIZE:
+                self.flush()
 
 # USAGE EXAMPLE:
 """
@@ -1,14 +1,29 @@
 """
 HotelOpsAI Multi-Agent State Management Schema
 Senior AI Engineer Implementation
+
+State helpers mutate the ChatState they are given and return it; see
+_MUTATE_IN_PLACE and snapshot_state() for copies.
 """
 
-from typing import List, Dict, Optional, Literal, Any
+from typing import List, Deque, Dict, Optional, Literal, Any
 from typing_extensions import TypedDict
 from enum import Enum
+from functools import lru_cache
+from collections import deque
 from datetime import datetime
+from time import time_ns
+import copy
 import uuid
 
+# The helpers below update a ChatState in place and return it. A conversation
+# owns a single mutable state; use snapshot_state() where an independent copy
+# is needed (e.g. before persisting). Set to False to restore copy-on-write.
+_MUTATE_IN_PLACE = True
+
+# Routing, error and state-transition logs keep only the most recent entries
+HISTORY_MAXLEN = 200
+
 class AgentType(Enum):
     """Available specialized agents in the system"""
     ROUTER = "router"
@@ -58,7 +73,7 @@ class ConversationState(Enum):
 class Message(TypedDict):
     """Individual message structure"""
     id: str
-    timestamp: datetime
+    timestamp: int  # time_ns(); see timestamp_to_datetime()
     role: Literal["user", "assistant", "system"]
     content: str
     agent_id: Optional[str]
@@ -117,6 +132,8 @@ class ChatState(TypedDict):
     
     # === CORE CONVERSATION STATE ===
     messages: List[Message]
+    last_assistant_idx: Optional[int]  # index of the latest assistant message
+    last_saved_msg_id: Optional[str]  # id of the newest message already persisted
     user_id: str
     session_id: str
     conversation_id: str
@@ -128,7 +145,7 @@ class ChatState(TypedDict):
     intent_confidence: float
     active_agent: Optional[AgentType]
     previous_agent: Optional[AgentType]
-    routing_history: List[Dict[str, Any]]
+    routing_history: Deque[Dict[str, Any]]
     
     # === CONVERSATION FLOW STATE ===
     conversation_state: ConversationState
@@ -162,7 +179,7 @@ class ChatState(TypedDict):
     
     # === ERROR HANDLING ===
     last_error: Optional[str]
-    error_history: List[Dict[str, Any]]
+    error_history: Deque[Dict[str, Any]]
     recovery_attempts: int
     
     # === CONTEXT PRESERVATION ===
@@ -179,14 +196,16 @@ def create_initial_state(user_id: str, session_id: Optional[str] = None) -> Chat
     """Create initial chat state for new conversation"""
     
     if not session_id:
-        session_id = str(uuid.uuid4())[:8]
+        session_id = uuid.uuid4().hex[:8]
     
-    conversation_id = str(uuid.uuid4())
+    conversation_id = uuid.uuid4().hex
     current_time = datetime.now()
     
     return ChatState(
         # Core conversation
         messages=[],
+        last_assistant_idx=None,
+        last_saved_msg_id=None,
         user_id=user_id,
         session_id=session_id,
         conversation_id=conversation_id,
@@ -198,7 +217,7 @@ def create_initial_state(user_id: str, session_id: Optional[str] = None) -> Chat
         intent_confidence=0.0,
         active_agent=None,
         previous_agent=None,
-        routing_history=[],
+        routing_history=deque(maxlen=HISTORY_MAXLEN),
         
         # Conversation flow  
         conversation_state=ConversationState.IDLE.value,
@@ -232,7 +251,7 @@ def create_initial_state(user_id: str, session_id: Optional[str] = None) -> Chat
         
         # Error handling
         last_error=None,
-        error_history=[],
+        error_history=deque(maxlen=HISTORY_MAXLEN),
         recovery_attempts=0,
         
         # Context
@@ -246,9 +265,25 @@ def create_initial_state(user_id: str, session_id: Optional[str] = None) -> Chat
         rate_limit_status={}
     )
 
+def timestamp_to_datetime(timestamp: int) -> datetime:
+    """Convert a time_ns() timestamp from messages and history entries to a datetime"""
+    return datetime.fromtimestamp(timestamp / 1e9)
+
+@lru_cache(maxsize=None)
+def _enum_value(value: Any) -> str:
+    """String value of an enum member, or the value itself as a string (members are singletons)"""
+    return value.value if isinstance(value, Enum) else str(value)
+
+def _writable(state: ChatState) -> ChatState:
+    return state if _MUTATE_IN_PLACE else state.copy()
+
+def snapshot_state(state: ChatState) -> ChatState:
+    """Independent deep copy of the state, safe to persist or compare later"""
+    return copy.deepcopy(state)
+
 def update_state_timestamp(state: ChatState) -> ChatState:
     """Update the timestamp for state modifications"""
-    new_state = state.copy()
+    new_state = _writable(state)
     new_state["updated_at"] = datetime.now()
     return new_state
 
@@ -263,11 +298,11 @@ def add_message_to_state(
 ) -> ChatState:
     """Add a new message to the conversation state"""
     
-    new_state = state.copy()
+    new_state = _writable(state)
     
     message = Message(
-        id=str(uuid.uuid4()),
-        timestamp=datetime.now(),
+        id=uuid.uuid4().hex,
+        timestamp=time_ns(),
         role=role,
         content=content,
         agent_id=agent_id,
@@ -276,7 +311,13 @@ def add_message_to_state(
         metadata=metadata or {}
     )
     
-    new_state["messages"].append(message)
+    if new_state is state:
+        new_state["messages"].append(message)
+    else:
+        # Copy-on-write: a shallow copy still shares the list, so never append to it
+        new_state["messages"] = [*state["messages"], message]
+    if role == "assistant":
+        new_state["last_assistant_idx"] = len(new_state["messages"]) - 1
     return update_state_timestamp(new_state)
 
 def transition_conversation_state(
@@ -286,26 +327,21 @@ def transition_conversation_state(
 ) -> ChatState:
     """Transition conversation to a new state"""
     
-    updated_state = state.copy()
+    updated_state = _writable(state)
     
     # Log the transition
     current_state = state.get("conversation_state")
     
     # Handle both string and enum values for current state
-    from_state_value = None
-    if current_state:
-        if isinstance(current_state, str):
-            from_state_value = current_state
-        else:
-            from_state_value = current_state.value
+    from_state_value = _enum_value(current_state) if current_state else None
     
     # Handle new state - ensure it's stored as string
-    to_state_value = new_state.value if hasattr(new_state, 'value') else str(new_state)
+    to_state_value = _enum_value(new_state)
     
     transition_log = {
         "from_state": from_state_value,
         "to_state": to_state_value,
-        "timestamp": datetime.now(),
+        "timestamp": time_ns(),
         "reason": reason
     }
     
@@ -314,7 +350,7 @@ def transition_conversation_state(
     
     # Add to conversation context
     if "state_transitions" not in updated_state["conversation_context"]:
-        updated_state["conversation_context"]["state_transitions"] = []
+        updated_state["conversation_context"]["state_transitions"] = deque(maxlen=HISTORY_MAXLEN)
     
     updated_state["conversation_context"]["state_transitions"].append(transition_log)
     
@@ -328,7 +364,10 @@ def set_active_agent(
 ) -> ChatState:
     """Set the active agent and log routing decision"""
     
-    updated_state = state.copy()
+    # Read before the update, which may be in place
+    previous_agent = state.get("active_agent")
+    
+    updated_state = _writable(state)
     
     # Store previous agent
     updated_state["previous_agent"] = state["active_agent"]
@@ -336,11 +375,11 @@ def set_active_agent(
     
     # Log routing decision
     routing_entry = {
-        "agent": agent.value if hasattr(agent, 'value') else str(agent),
+        "agent": _enum_value(agent),
         "confidence": confidence,
-        "timestamp": datetime.now(),
+        "timestamp": time_ns(),
         "reason": reason,
-        "previous_agent": state.get("active_agent")
+        "previous_agent": previous_agent
     }
     
     updated_state["routing_history"].append(routing_entry)
@@ -356,13 +395,13 @@ def log_error_to_state(
 ) -> ChatState:
     """Log an error to the conversation state"""
     
-    updated_state = state.copy()
+    updated_state = _writable(state)
     
     error_entry = {
         "error_message": error_message,
         "error_type": error_type,
         "agent_id": agent_id,
-        "timestamp": datetime.now(),
+        "timestamp": time_ns(),
         "recoverable": recoverable,
         "retry_count": state["retry_count"]
     }
@@ -376,19 +415,16 @@ def log_error_to_state(
     return update_state_timestamp(updated_state)
 
 # Utility functions for state validation
+_REQUIRED_KEYS = (
+    "user_id", "session_id", "conversation_id",
+    "messages", "conversation_state"
+)
+
 def validate_state_integrity(state: ChatState) -> List[str]:
     """Validate state integrity and return any issues"""
-    issues = []
-    
-    # Check required fields
-    required_keys = [
-        "user_id", "session_id", "conversation_id", 
-        "messages", "conversation_state"
-    ]
     
-    for key in required_keys:
-        if key not in state or state[key] is None:
-            issues.append(f"Missing required field: {key}")
+    # Check required fields - absent and None-valued keys both count as missing
+    issues = [f"Missing required field: {key}" for key in _REQUIRED_KEYS if state.get(key) is None]
     
     # Check data consistency
     if state.get("retry_count", 0) > state.get("max_retries", 3):
@@ -1,17 +1,140 @@
+import re
+from functools import lru_cache
 from langgraph.graph import StateGraph, END
 from typing import TypedDict
 from tools import user_tools, service_tools, troubleshooting, faq_tools
 from tools.interactive_user_manager import interactive_user_manager
 from tools.session_manager import session_manager, ConversationState
-from context.role_context import get_contextual_prompt, is_user_management_query
+from context.role_context import get_contextual_prompt, is_user_management_query, get_canned_reply
 from llm_utils import ask_gemini
 
+# Try to import pyahocorasick for single-pass keyword matching (optional)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Keyword groups for route_decider, one bit each
+_K_CREATE = 1 << 0     # create / add
+_K_NEW = 1 << 1        # new user phrasing that isn't create/add
+_K_USER = 1 << 2
+_K_EDIT = 1 << 3
+_K_DELETE = 1 << 4
+_K_LIST = 1 << 5
+_K_ALL_USER = 1 << 6
+_K_SERVICE = 1 << 7
+_K_HELP = 1 << 8
+_K_TROUBLE = 1 << 9
+
+_ROUTE_KEYWORDS = {
+    "create": _K_CREATE, "add": _K_CREATE,
+    "new": _K_NEW, "wanna add": _K_NEW, "want to add": _K_NEW,
+    "user": _K_USER,
+    "edit": _K_EDIT, "update": _K_EDIT, "modify": _K_EDIT, "change": _K_EDIT,
+    "delete": _K_DELETE, "remove": _K_DELETE,
+    "list": _K_LIST, "show": _K_LIST,
+    "all user": _K_ALL_USER,
+    "service": _K_SERVICE, "work order": _K_SERVICE,
+    "faq": _K_HELP, "help": _K_HELP, "how do i": _K_HELP, "how to": _K_HELP,
+    "question": _K_HELP, "guide": _K_HELP,
+    "trouble": _K_TROUBLE, "error": _K_TROUBLE, "not working": _K_TROUBLE, "issue": _K_TROUBLE,
+}
+
+# First rule whose groups all matched wins; each group is an any-of bitmask
+_KEYWORD_RULES = (
+    ((_K_CREATE | _K_NEW, _K_USER), "create_user_node"),
+    ((_K_EDIT, _K_USER), "edit_user_node"),
+    ((_K_DELETE, _K_USER), "delete_user_node"),
+    ((_K_LIST, _K_USER), "list_users_node"),
+    ((_K_ALL_USER,), "list_users_node"),
+    ((_K_CREATE, _K_SERVICE), "create_service_node"),
+    ((_K_SERVICE,), "list_services_node"),
+    ((_K_HELP,), "faq_node"),
+    ((_K_TROUBLE,), "troubleshoot_node"),
+)
+
+# Structured user data: a comma-separated row with an "@" anywhere in it -
+# the email may come before or after the first comma
+_STRUCTURED_USER_RE = re.compile(r"(?=[\s\S]*,)[\s\S]*@")
+
+# In-flight conversations keep going to the node that owns them
+_STATE_ROUTES = {
+    ConversationState.COLLECTING_USER_DATA.value: "create_user_node",
+    ConversationState.CONFIRMING_USER_CREATE.value: "create_user_node",
+    ConversationState.COLLECTING_USER_UPDATES.value: "edit_user_node",
+    ConversationState.CONFIRMING_USER_UPDATE.value: "edit_user_node",
+    ConversationState.CONFIRMING_USER_DELETE.value: "delete_user_node",
+}
+
+def _build_route_automaton():
+    automaton = ahocorasick.Automaton()
+    for keyword, flag in _ROUTE_KEYWORDS.items():
+        automaton.add_word(keyword, flag)
+    automaton.make_automaton()
+    return automaton
+
+_ROUTE_AUTOMATON = _build_route_automaton() if AHOCORASICK_AVAILABLE else None
+# Fallback: a lookahead tries every start position, so overlapping keywords all match
+_ROUTE_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in sorted(_ROUTE_KEYWORDS, key=len, reverse=True)) + "))"
+)
+
+def _keyword_mask(query: str) -> int:
+    """Bitmask of the keyword groups present in the lowercased query, in one pass"""
+    mask = 0
+    if _ROUTE_AUTOMATON is not None:
+        for _, flag in _ROUTE_AUTOMATON.iter(query):
+            mask |= flag
+    else:
+        for keyword in _ROUTE_KEYWORD_RE.findall(query):
+            mask |= _ROUTE_KEYWORDS[keyword]
+    return mask
+
+# Static parts of the LLM prompts; nodes only splice in the query and retrieved context
+_USER_ASKED_PREFIX = "The user asked: "
+_LIST_SERVICES_PROMPT_INFIX = "\n\nHere is the current list of services/work orders in the system:\n"
+_LIST_SERVICES_PROMPT_SUFFIX = "\n\nRespond naturally and helpfully. Format the services list in a clear, readable way."
+_CREATE_SERVICE_PROMPT_PREFIX = "The user wants to create a new service/work order: "
+_CREATE_SERVICE_PROMPT_SUFFIX = """
+
+To create a service or work order, I need the following information:
+- Name/Title (required) - describe what the service is
+- Department/Team (required) - which team will handle this (e.g., Housekeeping, Maintenance, Front Desk, etc.)
+- SLA/Expected completion time (required) - how many hours this should take
+
+Please respond naturally and ask the user to provide the missing information needed to create the service/work order. Be conversational and helpful."""
+_FAQ_ROLE_CONTEXT_PREFIX = "RELEVANT FAQ INFORMATION:\n"
+_FAQ_ROLE_CONTEXT_SUFFIX = """
+
+As the HotelOpsAI User Management Assistant, provide professional guidance based on this FAQ information. Include specific UI references, step-by-step instructions, and role-based permission requirements where applicable."""
+_FAQ_FOUND_INFIX = "\n\nI found relevant information in our FAQ database:\n\n"
+_FAQ_FOUND_SUFFIX = "\n\nPlease provide a helpful, natural response based on this information. If multiple FAQs are relevant, summarize the key points. Be conversational and offer to help with any follow-up questions."
+_FAQ_ROLE_NO_MATCH_PREFIX = "No specific FAQs found for this user management query.\n\nAvailable FAQ categories: "
+_FAQ_ROLE_NO_MATCH_SUFFIX = """
+
+As the HotelOpsAI User Management Assistant, guide the user to the appropriate resources or provide general user management assistance within your expertise area."""
+_FAQ_NO_MATCH_INFIX = "\n\nI couldn't find specific FAQs matching this query, but I can help with questions in these areas:\n"
+_FAQ_NO_MATCH_SUFFIX = "\n\nPlease respond helpfully and ask the user to be more specific or choose a category they're interested in."
+_TROUBLESHOOT_PROMPT_PREFIX = "The user has a troubleshooting request: "
+_TROUBLESHOOT_PROMPT_INFIX = "\n\nHere's the relevant information I found:\n\n"
+_TROUBLESHOOT_PROMPT_SUFFIX = "\n\nPlease provide a helpful, step-by-step response. Be clear and actionable. If this seems like a complex issue, suggest contacting support with specific details."
+_FALLBACK_PROMPT_SUFFIX = ". Respond naturally and helpfully as an AI assistant for HotelOpsAI."
+
 class AgentState(TypedDict):
     query: str
     response: str
     session_id: str
     conversation_state: str  # Store session state in LangGraph state
     session_data: dict       # Store session data in LangGraph state
+    is_user_mgmt: bool               # is_user_management_query(query), computed once per turn
+    troubleshoot_specific: str       # Filled by the parallel troubleshooting lookups
+    troubleshoot_faq_context: str
+
+# Routes whose retrieval steps are independent and run as parallel branches
+_ROUTE_FAN_OUT = {
+    "troubleshoot_node": ["troubleshoot_specific_node", "troubleshoot_faq_node"],
+}
 
 def load_session_state(state: AgentState):
     """Load session state into LangGraph state for persistence"""
@@ -20,62 +143,43 @@ def load_session_state(state: AgentState):
     # Get existing session data from session manager
     session_data = session_manager.get_session(session_id)
     
-    # Copy session data into LangGraph state for persistence
-    new_state = dict(state)
-    new_state["conversation_state"] = session_data["state"].value
-    new_state["session_data"] = session_data["data"].copy()
-    
-    return new_state
+    # Return only the fields this node sets - LangGraph merges the update into state
+    return {
+        "conversation_state": session_data["state"].value,
+        "session_data": session_data["data"].copy(),
+        "is_user_mgmt": is_user_management_query(str(state.get("query", "")))
+    }
 
 def route_decider(state: AgentState):
-    query = str(state.get("query", "")).lower()
-    original_query = str(state.get("query", ""))
-    conversation_state = state.get("conversation_state", "idle")
+    return _route_pure(state.get("conversation_state", "idle"), str(state.get("query", "")))
+
+@lru_cache(maxsize=4096)
+def _route_pure(conversation_state: str, original_query: str) -> str:
+    """Routing decision - a pure function of the state and query, so repeats are memoized"""
+    query = original_query.lower()
     
     # FIRST: Check if we're in an active conversation state
-    if conversation_state == ConversationState.COLLECTING_USER_DATA.value:
-        return "create_user_node"  # Continue user creation flow
-    elif conversation_state == ConversationState.CONFIRMING_USER_CREATE.value:
-        return "create_user_node"  # Handle confirmation
-    elif conversation_state == ConversationState.COLLECTING_USER_UPDATES.value:
-        return "edit_user_node"
-    elif conversation_state == ConversationState.CONFIRMING_USER_UPDATE.value:
-        return "edit_user_node"
-    elif conversation_state == ConversationState.CONFIRMING_USER_DELETE.value:
-        return "delete_user_node"
+    active_route = _STATE_ROUTES.get(conversation_state)
+    if active_route:
+        return active_route
     
     # SECOND: Check for new requests (when not in active conversation)
     # Check for structured user data first (comma-separated with email)
-    if "," in original_query and "@" in original_query:
+    if _STRUCTURED_USER_RE.match(original_query):
         return "create_user_node"
 
-    # User management operations - more comprehensive patterns
-    if ("create" in query or "add" in query or "new" in query or "wanna add" in query or "want to add" in query) and "user" in query:
-        return "create_user_node"
-    elif ("edit" in query or "update" in query or "modify" in query or "change" in query) and "user" in query:
-        return "edit_user_node"
-    elif ("delete" in query or "remove" in query) and "user" in query:
-        return "delete_user_node"
-    elif ("list" in query and "user" in query) or ("show" in query and "user" in query) or ("all user" in query):
-        return "list_users_node"
-
-    # Service/Work Order management
-    elif ("create" in query or "add" in query) and ("service" in query or "work order" in query):
-        return "create_service_node"
-    elif "service" in query or "work order" in query:
-        return "list_services_node"
-
-    # FAQ and Help
-    elif ("faq" in query or "help" in query or "how do i" in query or "how to" in query or
-          "question" in query or "guide" in query):
-        return "faq_node"
-
-    # Troubleshooting
-    elif "trouble" in query or "error" in query or "not working" in query or "issue" in query:
-        return "troubleshoot_node"
+    # User management, service, FAQ and troubleshooting keywords, in priority order
+    mask = _keyword_mask(query)
+    for groups, route in _KEYWORD_RULES:
+        if all(mask & group for group in groups):
+            return route
 
     return "fallback"
 
+def get_route_cache_stats():
+    """Hit/miss counters of the routing decision cache"""
+    return _route_pure.cache_info()._asdict()
+
 def save_session_state(state: AgentState):
     """Save LangGraph state back to session manager for persistence"""
     session_id = str(state.get("session_id", "default"))
@@ -91,181 +195,149 @@ def save_session_state(state: AgentState):
     # Update session manager with current state
     session_manager.set_state(session_id, conv_state, session_data)
     
-    return state
-
-def router_node(state: AgentState):
-    # Pass through the state unchanged - just a routing hub
-    return state
+    # Nothing to merge back - LangGraph state is already up to date
+    return {}
 
 def list_users_node(state: AgentState):
     q = str(state.get("query", ""))
     session_id = str(state.get("session_id", "default"))
     
     # Use interactive user manager for actual functionality
-    response = interactive_user_manager.process_user_request(q, session_id)
-    return {"query": q, "response": response, "session_id": session_id}
-
-def create_user_node(state: AgentState):
-    q = str(state.get("query", ""))
-    session_id = str(state.get("session_id", "default"))
-    
-    # Use interactive user manager for actual user creation
-    response = interactive_user_manager.process_user_request(q, session_id)
-    
-    # Get updated session state and sync with LangGraph state
-    updated_session = session_manager.get_session(session_id)
-    
-    return {
-        "query": q, 
-        "response": response, 
-        "session_id": session_id,
-        "conversation_state": updated_session["state"].value,
-        "session_data": updated_session["data"].copy()
-    }
-
-def edit_user_node(state: AgentState):
-    q = str(state.get("query", ""))
-    session_id = str(state.get("session_id", "default"))
-    
-    # Use interactive user manager for actual user editing
-    response = interactive_user_manager.process_user_request(q, session_id)
-    
-    # Get updated session state and sync with LangGraph state
-    updated_session = session_manager.get_session(session_id)
-    
-    return {
-        "query": q, 
-        "response": response, 
-        "session_id": session_id,
-        "conversation_state": updated_session["state"].value,
-        "session_data": updated_session["data"].copy()
-    }
-
-def delete_user_node(state: AgentState):
-    q = str(state.get("query", ""))
-    session_id = str(state.get("session_id", "default"))
-    
-    # Use interactive user manager for actual user deletion
-    response = interactive_user_manager.process_user_request(q, session_id)
-    
-    # Get updated session state and sync with LangGraph state
-    updated_session = session_manager.get_session(session_id)
-    
-    return {
-        "query": q, 
-        "response": response, 
-        "session_id": session_id,
-        "conversation_state": updated_session["state"].value,
-        "session_data": updated_session["data"].copy()
-    }
+    response = interactive_user_manager.process_user_request(q, session_id).response
+    return {"response": response}
+
+def _make_user_crud_node(name: str, action: str):
+    """Build a user CRUD node; the manager's session state decides what each turn does"""
+    def node(state: AgentState):
+        q = str(state.get("query", ""))
+        session_id = str(state.get("session_id", "default"))
+        
+        # Use interactive user manager for the actual operation; it reports the updated session state
+        result = interactive_user_manager.process_user_request(q, session_id)
+        
+        return {
+            "response": result.response, 
+            "conversation_state": result.state.value,
+            "session_data": result.data
+        }
+    
+    node.__name__ = node.__qualname__ = name
+    node.__doc__ = f"Handle a user {action} turn"
+    return node
+
+create_user_node = _make_user_crud_node("create_user_node", "creation")
+edit_user_node = _make_user_crud_node("edit_user_node", "editing")
+delete_user_node = _make_user_crud_node("delete_user_node", "deletion")
+
+def _render_services_md(services: list) -> str:
+    """Markdown list of services/work orders"""
+    if not services:
+        return "There are no services or work orders in the system yet."
+    lines = [f"Here are the current services/work orders ({len(services)}):", ""]
+    for service in services:
+        lines.append(
+            f"- **{service.get('name', 'Unnamed')}** (ID: {service.get('id', 'n/a')}) - "
+            f"{service.get('department', 'No department')}, SLA {service.get('sla', 'not set')}"
+        )
+    return "\n".join(lines)
 
 def list_services_node(state: AgentState):
     q = str(state.get("query", ""))
     services_list = service_tools.list_services()
-    prompt = f"The user asked: {q}\n\nHere is the current list of services/work orders in the system:\n{services_list}\n\nRespond naturally and helpfully. Format the services list in a clear, readable way."
+    
+    # A plain "list/show services" request gets a templated list; other questions about services go to the LLM
+    mask = _keyword_mask(q.lower())
+    if isinstance(services_list, list) and mask & _K_LIST and not mask & (_K_HELP | _K_TROUBLE):
+        return {"response": _render_services_md(services_list)}
+    
+    prompt = "".join((_USER_ASKED_PREFIX, q, _LIST_SERVICES_PROMPT_INFIX, str(services_list), _LIST_SERVICES_PROMPT_SUFFIX))
     response = ask_gemini(prompt)
-    return {"query": q, "response": response}
+    return {"response": response}
 
 def create_service_node(state: AgentState):
     q = str(state.get("query", ""))
-    prompt = f"""The user wants to create a new service/work order: {q}
-
-To create a service or work order, I need the following information:
-- Name/Title (required) - describe what the service is
-- Department/Team (required) - which team will handle this (e.g., Housekeeping, Maintenance, Front Desk, etc.)
-- SLA/Expected completion time (required) - how many hours this should take
-
-Please respond naturally and ask the user to provide the missing information needed to create the service/work order. Be conversational and helpful."""
+    prompt = _CREATE_SERVICE_PROMPT_PREFIX + q + _CREATE_SERVICE_PROMPT_SUFFIX
     response = ask_gemini(prompt)
-    return {"query": q, "response": response}
+    return {"response": response}
 
 def faq_node(state: AgentState):
     q = str(state.get("query", ""))
     
-    # Search FAQ database
-    faq_results = faq_tools.search_faq(q, limit=5)
+    # Search FAQ database (formatted matches are cached per normalized query)
+    faq_context = faq_tools.get_faq_context(q, limit=5)
     
-    if faq_results:
-        # Format FAQ results for context
-        faq_context = faq_tools.format_faq_results(faq_results)
-        
+    if faq_context:
         # Check if this is a user management query to apply role context
-        if is_user_management_query(q):
-            context = f"""RELEVANT FAQ INFORMATION:
-{faq_context}
-
-As the HotelOpsAI User Management Assistant, provide professional guidance based on this FAQ information. Include specific UI references, step-by-step instructions, and role-based permission requirements where applicable."""
+        if state.get("is_user_mgmt"):
+            context = _FAQ_ROLE_CONTEXT_PREFIX + faq_context + _FAQ_ROLE_CONTEXT_SUFFIX
             prompt = get_contextual_prompt(q, context)
         else:
-            prompt = f"""The user asked: {q}
-
-I found relevant information in our FAQ database:
-
-{faq_context}
-
-Please provide a helpful, natural response based on this information. If multiple FAQs are relevant, summarize the key points. Be conversational and offer to help with any follow-up questions."""
+            prompt = "".join((_USER_ASKED_PREFIX, q, _FAQ_FOUND_INFIX, faq_context, _FAQ_FOUND_SUFFIX))
     else:
         # No specific FAQs found, provide general help
         categories = faq_tools.get_all_categories()
         
-        if is_user_management_query(q):
-            context = f"""No specific FAQs found for this user management query.
-
-Available FAQ categories: {', '.join(categories)}
-
-As the HotelOpsAI User Management Assistant, guide the user to the appropriate resources or provide general user management assistance within your expertise area."""
+        if state.get("is_user_mgmt"):
+            context = _FAQ_ROLE_NO_MATCH_PREFIX + ', '.join(categories) + _FAQ_ROLE_NO_MATCH_SUFFIX
             prompt = get_contextual_prompt(q, context)
         else:
-            prompt = f"""The user asked: {q}
-
-I couldn't find specific FAQs matching this query, but I can help with questions in these areas:
-{', '.join(categories)}
-
-Please respond helpfully and ask the user to be more specific or choose a category they're interested in."""
+            prompt = "".join((_USER_ASKED_PREFIX, q, _FAQ_NO_MATCH_INFIX, ', '.join(categories), _FAQ_NO_MATCH_SUFFIX))
     
     response = ask_gemini(prompt)
-    return {"query": q, "response": response}
+    return {"response": response}
+
+def troubleshoot_specific_node(state: AgentState):
+    q = str(state.get("query", ""))
+    return {"troubleshoot_specific": troubleshooting.find_specific_troubleshooting(q) or ""}
+
+def troubleshoot_faq_node(state: AgentState):
+    q = str(state.get("query", ""))
+    return {"troubleshoot_faq_context": faq_tools.get_enhanced_troubleshooting_context(q)}
 
 def troubleshoot_node(state: AgentState):
     q = str(state.get("query", ""))
     
-    # Get enhanced troubleshooting context (includes FAQ search)
-    combined_context = troubleshooting.get_combined_help_context(q)
+    # Join the troubleshooting and FAQ lookups that ran in parallel
+    combined_context = troubleshooting.combine_help_context(
+        state.get("troubleshoot_specific"), state.get("troubleshoot_faq_context", "")
+    )
     
-    prompt = f"""The user has a troubleshooting request: {q}
-
-Here's the relevant information I found:
-
-{combined_context}
-
-Please provide a helpful, step-by-step response. Be clear and actionable. If this seems like a complex issue, suggest contacting support with specific details."""
+    prompt = "".join((_TROUBLESHOOT_PROMPT_PREFIX, q, _TROUBLESHOOT_PROMPT_INFIX, combined_context, _TROUBLESHOOT_PROMPT_SUFFIX))
     
     response = ask_gemini(prompt)
-    return {"query": q, "response": response}
+    return {"response": response}
 
 def fallback_node(state: AgentState):
     q = str(state.get("query", ""))
     session_id = str(state.get("session_id", "default"))
     
+    canned = get_canned_reply(q)
+    if canned is not None:
+        return {"response": canned}
+    
     try:
         # Check if this could be a user management query that didn't match other routes
-        if is_user_management_query(q):
+        if state.get("is_user_mgmt"):
             # Use interactive user manager for actual user management operations
-            response = interactive_user_manager.process_user_request(q, session_id)
-            return {"query": q, "response": response, "session_id": session_id}
+            response = interactive_user_manager.process_user_request(q, session_id).response
+            return {"response": response}
         else:
-            prompt = f"The user asked: {q}. Respond naturally and helpfully as an AI assistant for HotelOpsAI."
+            prompt = _USER_ASKED_PREFIX + q + _FALLBACK_PROMPT_SUFFIX
             response = ask_gemini(prompt)
-            return {"query": q, "response": response, "session_id": session_id}
+            return {"response": response}
     except Exception as e:
-        return {"query": q, "response": "I encountered an error while processing your request. Please try again or contact support.", "session_id": session_id}
+        return {"response": "I encountered an error while processing your request. Please try again or contact support."}
 
-def build_agent():
+def fan_out_route(state: AgentState):
+    """Route via route_decider, expanding routes with parallel retrieval branches"""
+    route = route_decider(state)
+    return _ROUTE_FAN_OUT.get(route, route)
+
+def _build_agent():
     graph = StateGraph(AgentState)
     
     # State management nodes
     graph.add_node("load_session", load_session_state)
-    graph.add_node("router", router_node)
     graph.add_node("save_session", save_session_state)
     
     # User management nodes
@@ -280,14 +352,15 @@ def build_agent():
     
     # FAQ and troubleshooting nodes
     graph.add_node("faq_node", faq_node)
+    graph.add_node("troubleshoot_specific_node", troubleshoot_specific_node)
+    graph.add_node("troubleshoot_faq_node", troubleshoot_faq_node)
     graph.add_node("troubleshoot_node", troubleshoot_node)
     graph.add_node("fallback", fallback_node)
 
     # Set entry point to load session state first
     graph.set_entry_point("load_session")
     
-    # Flow: load_session -> router -> actual nodes -> save_session -> END
-    graph.add_edge("load_session", "router")
+    # Flow: load_session -> actual nodes -> save_session -> END
     
     # All nodes go through save_session before END
     graph.add_edge("list_users_node", "save_session")
@@ -300,13 +373,16 @@ def build_agent():
     graph.add_edge("troubleshoot_node", "save_session")
     graph.add_edge("fallback", "save_session")
     
+    # Fan-in: troubleshoot_node waits for both parallel lookups
+    graph.add_edge(["troubleshoot_specific_node", "troubleshoot_faq_node"], "troubleshoot_node")
+    
     # Save session then END
     graph.add_edge("save_session", END)
 
-    # Conditional edges from router to destination nodes via decider
+    # Route straight out of load_session - route_decider needs the loaded conversation_state
     graph.add_conditional_edges(
-        "router",
-        route_decider,
+        "load_session",
+        fan_out_route,
         {
             "list_users_node": "list_users_node",
             "create_user_node": "create_user_node",
@@ -315,9 +391,17 @@ def build_agent():
             "list_services_node": "list_services_node",
             "create_service_node": "create_service_node",
             "faq_node": "faq_node",
-            "troubleshoot_node": "troubleshoot_node",
+            "troubleshoot_specific_node": "troubleshoot_specific_node",
+            "troubleshoot_faq_node": "troubleshoot_faq_node",
             "fallback": "fallback",
         },
     )
 
     return graph.compile()
+
+# Compiled once per process; every caller shares the same graph
+AGENT = _build_agent()
+
+def build_agent():
+    """Return the compiled support agent graph"""
+    return AGENT
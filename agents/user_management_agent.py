@@ -24,6 +24,31 @@ from database.memory_db import db_adapter
 from logger_config import agent_logger, log_action, log_error, log_user_mgmt
 from llm_utils import ask_gemini
 
+# Inline user data in a message ("name: John", an email, a phone number...), as one scan.
+# The bare email alternative only starts at the beginning of a token: a match from inside a
+# token implies one from its start, and retrying \S+ from every offset of a long token is quadratic.
+_USER_DATA_RE = re.compile(
+    r'name\s*[:=]\s*\w+'                # name: John (also first name: / last name:)
+    r'|email\s*[:=]\s*\S+@\S+'         # email: john@mail.com
+    r'|phone\s*[:=]\s*[\d\s\-\(\)]+'   # phone: 123-456-7890
+    r'|(?<!\S)\S+@\S+\.\S+'            # email pattern, from the start of a token
+    r'|[\d\s\-\(\)]{10,}'              # phone pattern (10+ digits)
+    r'|role\s*[:=]\s*\w+'              # role: manager
+    r'|department\s*[:=]\s*\w+',       # department: FO
+    re.IGNORECASE
+)
+# Every alternative above except the phone run needs ':', '=' or '@', so messages without
+# them only need the single-class phone scan
+_PHONE_RUN_RE = re.compile(r'[\d\s\-\(\)]{10,}')
+_PHONE_RUN_MIN_LEN = 10
+
+# Confirmation replies; matched as substrings, or exactly as a whole reply on the fast path
+_CONFIRM_WORDS = ('yes', 'y', 'confirm', 'create', 'proceed', 'ok', 'okay')
+_CANCEL_WORDS = ('no', 'n', 'cancel', 'stop', 'abort')
+_CONFIRM_REPLIES = frozenset(_CONFIRM_WORDS)
+_CANCEL_REPLIES = frozenset(_CANCEL_WORDS)
+_REPLY_STRIP = ".!"
+
 class UserManagementAgent:
     """
     Specialized agent for user management operations
@@ -562,21 +587,30 @@ class UserManagementAgent:
         
         response_lower = message.lower().strip()
         
-        # Check if this looks like new user data instead of confirmation
-        if self._looks_like_user_data(message):
-            log_action("CONFIRMATION_NEW_DATA", f"Detected new user data in confirmation: {message[:50]}...", 
-                      session_id=state["session_id"])
-            
-            # Extract data from the new message
-            updated_state = data_extraction_agent.extract_entities(
-                message, "user_create", state
-            )
+        # Fast path: a bare "yes" / "no" reply can't carry user data
+        reply = response_lower.strip(_REPLY_STRIP)
+        confirmed = reply in _CONFIRM_REPLIES
+        cancelled = reply in _CANCEL_REPLIES
+        
+        if not (confirmed or cancelled):
+            # Check if this looks like new user data instead of confirmation
+            if self._looks_like_user_data(message):
+                log_action("CONFIRMATION_NEW_DATA", f"Detected new user data in confirmation: {message[:50]}...", 
+                          session_id=state["session_id"])
+                
+                # Extract data from the new message
+                updated_state = data_extraction_agent.extract_entities(
+                    message, "user_create", state
+                )
+                
+                # Update the user operation with newly extracted data
+                return self._update_user_operation_from_entities(updated_state, message)
             
-            # Update the user operation with newly extracted data
-            return self._update_user_operation_from_entities(updated_state, message)
+            confirmed = any(word in response_lower for word in _CONFIRM_WORDS)
+            cancelled = any(word in response_lower for word in _CANCEL_WORDS)
         
         # Handle positive confirmations
-        elif any(word in response_lower for word in ['yes', 'y', 'confirm', 'create', 'proceed', 'ok', 'okay']):
+        if confirmed:
             # Before executing, check if we actually have valid data
             user_op = state.get("user_operation", {})
             if not user_op or not user_op.get("first_name") or not user_op.get("last_name") or not user_op.get("email"):
@@ -612,7 +646,7 @@ class UserManagementAgent:
             return self._execute_user_creation(state)
         
         # Handle negative confirmations  
-        elif any(word in response_lower for word in ['no', 'n', 'cancel', 'stop', 'abort']):
+        elif cancelled:
             updated_state = add_message_to_state(
                 state, "User creation cancelled. How can I help you?", "assistant",
                 agent_id="user_management"
@@ -643,30 +677,22 @@ class UserManagementAgent:
         """Check if message contains any user data"""
         
         # Specific patterns for user data - avoid false positives
-        patterns = [
-            r'name\s*[:=]\s*\w+',  # name: John
-            r'email\s*[:=]\s*\S+@\S+',  # email: john@mail.com
-            r'phone\s*[:=]\s*[\d\s\-\(\)]+',  # phone: 123-456-7890
-            r'\S+@\S+\.\S+',  # email pattern
-            r'[\d\s\-\(\)]{10,}',  # phone pattern (10+ digits)
-            r'role\s*[:=]\s*\w+',  # role: manager
-            r'department\s*[:=]\s*\w+',  # department: FO
-            r'first\s*name\s*[:=]\s*\w+',  # first name: John
-            r'last\s*name\s*[:=]\s*\w+',  # last name: Doe
-        ]
-        
-        message_lower = message.lower()
-        
-        # Check for any pattern - be more liberal
-        for pattern in patterns:
-            if re.search(pattern, message_lower):
-                log_action("USER_DATA_DETECTED", f"Pattern matched: {pattern} in '{message}'", 
-                          session_id="unknown")
-                return True
+        if '@' in message or ':' in message or '=' in message:
+            match = _USER_DATA_RE.search(message)
+        elif len(message) >= _PHONE_RUN_MIN_LEN:
+            match = _PHONE_RUN_RE.search(message)
+        else:
+            # Short replies like "yes" / "no" can't hold user data
+            match = None
+        if match:
+            log_action("USER_DATA_DETECTED", f"Pattern matched: '{match.group(0)}' in '{message}'", 
+                      session_id="unknown")
+            return True
         
         # Check for basic comma-separated values that could be names/emails
         # But exclude common command patterns
         if ',' in message and len(message.split(',')) >= 2:
+            message_lower = message.lower()
             # Exclude messages that are clearly commands
             command_words = {'create', 'add', 'make', 'new', 'please', 'can', 'could', 'want', 'need', 'help'}
             if any(word in message_lower for word in command_words):
@@ -82,16 +82,37 @@ Please respond as the HotelOpsAI User Management Assistant, providing profession
     
     return prompt
 
+USER_MGMT_KEYWORDS = (
+    "user", "users", "account", "accounts", "create user", "edit user", "delete user",
+    "permissions", "roles", "access", "login", "password", "reset password",
+    "block user", "invite user", "department", "staff", "admin", "company admin",
+    "privileges", "module permissions", "dashboard", "user management"
+)
+
 def is_user_management_query(query: str) -> bool:
     """
     Determine if a query is specifically about user management
     """
-    user_mgmt_keywords = [
-        "user", "users", "account", "accounts", "create user", "edit user", "delete user",
-        "permissions", "roles", "access", "login", "password", "reset password",
-        "block user", "invite user", "department", "staff", "admin", "company admin",
-        "privileges", "module permissions", "dashboard", "user management"
-    ]
-    
     query_lower = query.lower()
-    return any(keyword in query_lower for keyword in user_mgmt_keywords)
+    return any(keyword in query_lower for keyword in USER_MGMT_KEYWORDS)
+
+# Canned replies for trivial openers and closers - shared by every entry point
+# so they are answered the same way without an LLM call
+_GREETING_REPLY = "Hi! I'm the HotelOpsAI assistant. I can help you manage users, services and work orders, or answer questions from the FAQ. What would you like to do?"
+_THANKS_REPLY = "You're welcome! Let me know if there's anything else I can help with."
+_CANNED_STRIP = ".,!? "
+CANNED_REPLIES = {
+    "": "Could you share a bit more about what you need? I can help with users, services and work orders, FAQs and troubleshooting.",
+    "hi": _GREETING_REPLY, "hello": _GREETING_REPLY, "hey": _GREETING_REPLY,
+    "good morning": _GREETING_REPLY, "good afternoon": _GREETING_REPLY, "good evening": _GREETING_REPLY,
+    "help": _GREETING_REPLY,
+    "thanks": _THANKS_REPLY, "thank you": _THANKS_REPLY, "thx": _THANKS_REPLY,
+    "ok": "Great! Is there anything else I can help with?", "okay": "Great! Is there anything else I can help with?",
+    "bye": "Goodbye! Feel free to come back any time.", "goodbye": "Goodbye! Feel free to come back any time.",
+}
+
+def get_canned_reply(message: str):
+    """
+    Canned reply for a trivial message, None when it needs real handling
+    """
+    return CANNED_REPLIES.get(message.strip().strip(_CANNED_STRIP).lower())
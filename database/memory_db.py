@@ -42,6 +42,9 @@ class MemoryDatabase:
         # Thread safety
         self._lock = Lock()
         
+        # Bumped on every user/service write so cached reads can detect stale data
+        self._data_version = 0
+        
         # Auto-increment counters
         self._counters = {
             "users": 1000,
@@ -101,6 +104,7 @@ class MemoryDatabase:
             
             # Store user
             self._data["users"][user_id] = user_record
+            self._data_version += 1
             
             # Update indexes
             self._update_indexes("users", user_id, user_record)
@@ -141,6 +145,7 @@ class MemoryDatabase:
             user_record = self._data["users"][user_id]
             user_record.update(updates)
             user_record["updated_at"] = datetime.now().isoformat()
+            self._data_version += 1
             
             # Update indexes
             self._update_indexes("users", user_id, user_record)
@@ -158,6 +163,7 @@ class MemoryDatabase:
             # Soft delete
             self._data["users"][user_id]["status"] = "deleted"
             self._data["users"][user_id]["deleted_at"] = datetime.now().isoformat()
+            self._data_version += 1
             
             log_action("USER_DELETED", f"User {user_id} deleted")
             
@@ -221,6 +227,7 @@ class MemoryDatabase:
             
             self._data["services"][service_id] = service_record
             self._update_indexes("services", service_id, service_record)
+            self._data_version += 1
             
             log_action("SERVICE_CREATED", f"Service {service_id} created")
             
@@ -257,6 +264,7 @@ class MemoryDatabase:
             service_record = self._data["services"][service_id]
             service_record.update(updates)
             service_record["updated_at"] = datetime.now().isoformat()
+            self._data_version += 1
             
             log_action("SERVICE_UPDATED", f"Service {service_id} updated")
             
@@ -316,6 +324,52 @@ class MemoryDatabase:
             conversation = self._data["conversations"].get(conversation_id)
             return deepcopy(conversation) if conversation else None
     
+    # === COMBINED OPERATIONS ===
+    
+    def save_all(self, session_id: str, session_data: Dict[str, Any],
+                 conversation_id: Optional[str] = None,
+                 conversation_data: Optional[Dict[str, Any]] = None,
+                 new_messages: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Save session and conversation data in a single locked write.
+        
+        Conversation fields are merged into the stored record and
+        new_messages are appended to its message history, so callers only
+        pass the messages added since their last save.
+        """
+        with self._lock:
+            now = datetime.now().isoformat()
+            
+            session_record = {
+                **session_data,
+                "session_id": session_id,
+                "updated_at": now
+            }
+            
+            if session_id not in self._data["sessions"]:
+                session_record["created_at"] = now
+            
+            self._data["sessions"][session_id] = session_record
+            
+            if conversation_id:
+                conv_record = self._data["conversations"].get(conversation_id)
+                is_new = conv_record is None
+                if is_new:
+                    conv_record = {"messages": []}
+                    self._data["conversations"][conversation_id] = conv_record
+                
+                if conversation_data:
+                    conv_record.update(conversation_data)
+                if new_messages:
+                    conv_record.setdefault("messages", []).extend(new_messages)
+                
+                conv_record["conversation_id"] = conversation_id
+                conv_record["updated_at"] = now
+                if is_new:
+                    conv_record["created_at"] = now
+            
+            return True
+    
     # === ANALYTICS OPERATIONS ===
     
     def record_metric(self, metric_name: str, value: Any, metadata: Optional[Dict] = None):
@@ -354,6 +408,11 @@ class MemoryDatabase:
         with self._lock:
             return phone in self._indexes["users_by_phone"]
     
+    def get_data_version(self) -> int:
+        """Counter that changes whenever user or service data is written"""
+        with self._lock:
+            return self._data_version
+    
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         with self._lock:
@@ -391,6 +450,7 @@ class MemoryDatabase:
                         elif table == "services":
                             self._update_indexes("services", record_id, record)
                 
+                self._data_version += 1
                 return True
         except Exception as e:
             log_error("IMPORT_ERROR", f"Failed to import {table}: {str(e)}")
@@ -401,6 +461,7 @@ class MemoryDatabase:
         with self._lock:
             if table in self._data:
                 self._data[table] = {} if isinstance(self._data[table], dict) else []
+                self._data_version += 1
                 
                 # Clear related indexes
                 if table == "users":
@@ -484,6 +545,18 @@ class DatabaseAdapter:
         """TODO: Replace with actual DB call"""
         return self.db.get_conversation(conversation_id)
     
+    def save_all(self, session_id: str, session_data: Dict,
+                 conversation_id: Optional[str] = None,
+                 conversation_data: Optional[Dict] = None,
+                 new_messages: Optional[List[Dict]] = None) -> bool:
+        """TODO: Replace with actual DB call (single transaction/pipeline)"""
+        return self.db.save_all(session_id, session_data, conversation_id,
+                                conversation_data, new_messages)
+    
+    def data_version(self) -> int:
+        """TODO: Replace with actual DB call (e.g. max(updated_at) or a change counter)"""
+        return self.db.get_data_version()
+    
     # Validation helpers
     def email_exists(self, email: str) -> bool:
         """TODO: Replace with actual DB call"""
@@ -4,8 +4,12 @@ ONLY focused on making existing features faster and more reliable
 NO new features - just pure performance improvements
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Callable, Tuple, Union
+import os
+import math
 import time
+from array import array
+from threading import Lock
 from functools import lru_cache
 
 class EfficiencyOptimizer:
@@ -160,26 +164,147 @@ class ResponseCache:
     Simple response caching to avoid repeating expensive operations
     """
     
-    def __init__(self, max_size=100):
+    def __init__(self, max_size=100, ttl_seconds: Optional[int] = None):
         self.cache = {}
         self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
     
-    def get(self, key: str) -> Optional[str]:
-        return self.cache.get(key)
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        
+        response, expires_at = entry
+        if expires_at is not None and expires_at < time.time():
+            del self.cache[key]
+            return None
+        return response
     
-    def set(self, key: str, response: str):
-        if len(self.cache) >= self.max_size:
+    def set(self, key: str, response: Any):
+        if key not in self.cache and len(self.cache) >= self.max_size:
             # Remove oldest entry
             oldest_key = next(iter(self.cache))
             del self.cache[oldest_key]
         
-        self.cache[key] = response
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        self.cache[key] = (response, expires_at)
     
     def should_cache(self, query: str) -> bool:
         # Cache FAQ and help responses
         query_lower = query.lower()
         return any(word in query_lower for word in ["help", "how", "what", "faq", "reset", "login"])
 
+# Semantic response caching
+def load_default_embedder() -> Optional[Callable[[str], List[float]]]:
+    """
+    Use Gemini embeddings when an API key is configured, otherwise None -
+    a SemanticResponseCache without an embedder only matches exact repeats
+    """
+    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY") or os.getenv("GEN_API_KEY")
+    if api_key:
+        try:
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+            embeddings = GoogleGenerativeAIEmbeddings(
+                model="models/embedding-001",
+                google_api_key=api_key
+            )
+            return embeddings.embed_query
+        except ImportError:
+            pass
+    
+    return None
+
+def _quantize_int8(vector: List[float]) -> Tuple[array, float]:
+    """Symmetric int8 quantization with one scale per vector"""
+    peak = max((abs(v) for v in vector), default=0.0)
+    if not peak:
+        return array("b", bytes(len(vector))), 0.0
+    factor = 127.0 / peak
+    return array("b", (max(-127, min(127, round(v * factor))) for v in vector)), peak / 127.0
+
+class SemanticResponseCache:
+    """
+    Response cache keyed by message embedding.
+    Paraphrased repeats ("list users" / "show me the users") reuse an earlier
+    response when cosine similarity clears the threshold.
+    Stored embeddings are int8 with a per-vector scale; queries stay float.
+    Without an embedding model there is no reliable similarity (bag-of-words
+    vectors match "reset my password" to "reset my wifi password"), so the
+    cache then only matches the exact normalized text.
+    """
+    
+    def __init__(self, embed_fn: Optional[Callable[[str], List[float]]] = None,
+                 threshold: float = 0.92, ttl_seconds: int = 900, max_size: int = 200):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        
+        # (namespace, state_bucket) -> [{"embedding", "scale" | "text", "payload", "expires_at"}]
+        self.entries: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._lock = Lock()
+    
+    def embed(self, text: str) -> Optional[Union[List[float], str]]:
+        """
+        Lookup key for text: the L2-normalized embedding (so a dot product is the
+        cosine similarity), or the normalized text itself when there is no embedder
+        """
+        normalized = " ".join(text.lower().split())
+        if self.embed_fn is None:
+            return normalized or None
+        
+        try:
+            vector = self.embed_fn(normalized)
+        except Exception:
+            return None
+        
+        norm = math.sqrt(sum(v * v for v in vector))
+        if not norm:
+            return None
+        return [v / norm for v in vector]
+    
+    def get(self, namespace: str, bucket: str, embedding: Union[List[float], str]) -> Optional[Dict[str, Any]]:
+        """Return the cached payload of the most similar live entry, if similar enough"""
+        now = time.time()
+        best_payload = None
+        best_similarity = self.threshold
+        
+        with self._lock:
+            for entry in self.entries.get((namespace, bucket), ()):
+                if entry["expires_at"] < now:
+                    continue
+                if isinstance(embedding, str):
+                    if entry["text"] == embedding:
+                        best_payload = entry["payload"]
+                    continue
+                similarity = entry["scale"] * sum(a * b for a, b in zip(embedding, entry["embedding"]))
+                if similarity >= best_similarity:
+                    best_similarity = similarity
+                    best_payload = entry["payload"]
+        
+        return dict(best_payload) if best_payload else None
+    
+    def set(self, namespace: str, bucket: str, embedding: Union[List[float], str], payload: Dict[str, Any]):
+        """Cache a payload, dropping expired and oldest entries for the bucket"""
+        now = time.time()
+        
+        with self._lock:
+            bucket_entries = [
+                entry for entry in self.entries.get((namespace, bucket), ())
+                if entry["expires_at"] >= now
+            ]
+            entry = {"payload": dict(payload), "expires_at": now + self.ttl_seconds}
+            if isinstance(embedding, str):
+                entry["text"] = embedding
+            else:
+                entry["embedding"], entry["scale"] = _quantize_int8(embedding)
+            bucket_entries.append(entry)
+            self.entries[(namespace, bucket)] = bucket_entries[-self.max_size:]
+    
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
 # Global instances
 efficiency_optimizer = EfficiencyOptimizer()
 response_cache = ResponseCache()
@@ -1,7 +1,7 @@
 import os
 import hashlib
 import time
-from functools import lru_cache
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -10,15 +10,22 @@ from logger_config import llm_logger, api_logger, log_api_call, log_error
 load_dotenv()
 genai.configure(api_key=os.environ.get("GEN_API_KEY"))
 
+_RESPONSE_CACHE_SIZE = 2048
+_RESPONSE_CACHE_TTL = 3600  # seconds
+_ERROR_PREFIX = "⚠️"
+
+def _prompt_key(prompt: str) -> str:
+    """Content address of a prompt"""
+    return hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+
 class QuotaManager:
-    """Manages API quota and request deduplication"""
+    """Manages API quota and the response cache"""
     
     def __init__(self):
         self.daily_requests = 0
         self.max_requests = 40  # Leave buffer for free tier
         self.last_reset = datetime.now().date()
-        self.processed_requests = set()
-        self.request_cache = {}
+        self.request_cache = OrderedDict()  # prompt_hash -> (cached_at, response), LRU order
         
     def can_make_request(self):
         """Check if we can make a request without exceeding quota"""
@@ -28,34 +35,38 @@ class QuotaManager:
         if today != self.last_reset:
             self.daily_requests = 0
             self.last_reset = today
-            self.processed_requests.clear()
             self.request_cache.clear()
             
         return self.daily_requests < self.max_requests
     
-    def record_request(self, prompt_hash: str):
+    def record_request(self):
         """Record a request to track quota"""
         self.daily_requests += 1
-        self.processed_requests.add(prompt_hash)
-    
-    def is_duplicate(self, prompt_hash: str):
-        """Check if this exact prompt was already processed"""
-        return prompt_hash in self.processed_requests
     
     def get_cached_response(self, prompt_hash: str):
-        """Get cached response if available"""
-        return self.request_cache.get(prompt_hash)
+        """Get cached response if available and not expired"""
+        entry = self.request_cache.get(prompt_hash)
+        if entry is None:
+            return None
+        cached_at, response = entry
+        if time.monotonic() - cached_at > _RESPONSE_CACHE_TTL:
+            del self.request_cache[prompt_hash]
+            return None
+        self.request_cache.move_to_end(prompt_hash)
+        return response
     
     def cache_response(self, prompt_hash: str, response: str):
-        """Cache a response"""
-        self.request_cache[prompt_hash] = response
+        """Cache a response, evicting the least recently used beyond the size limit"""
+        self.request_cache[prompt_hash] = (time.monotonic(), response)
+        self.request_cache.move_to_end(prompt_hash)
+        if len(self.request_cache) > _RESPONSE_CACHE_SIZE:
+            self.request_cache.popitem(last=False)
 
 # Global quota manager
 quota_manager = QuotaManager()
 
-@lru_cache(maxsize=100)
-def ask_gemini_cached(prompt_hash: str, prompt: str):
-    """Cached version of ask_gemini to avoid duplicate processing"""
+def _call_gemini(prompt: str):
+    """One Gemini API call; failures come back as an error reply"""
     try:
         # Log the API call attempt
         prompt_preview = prompt[:100] + "..." if len(prompt) > 100 else prompt
@@ -88,31 +99,27 @@ def ask_gemini_cached(prompt_hash: str, prompt: str):
 def ask_gemini(prompt: str):
     """Optimized Gemini API call with caching and quota management"""
     
-    # Create hash for deduplication
-    prompt_hash = hashlib.md5(prompt.encode()).hexdigest()
+    # Content-addressed key for the response cache
+    prompt_hash = _prompt_key(prompt)
     
-    # Check for duplicates
-    if quota_manager.is_duplicate(prompt_hash):
-        llm_logger.info(f"Skipping duplicate request: {prompt_hash[:8]}...")
-        return "Request already processed"
+    # Check cache first - repeated prompts are answered without spending quota
+    cached_response = quota_manager.get_cached_response(prompt_hash)
+    if cached_response:
+        llm_logger.info(f"Returning cached response for: {prompt_hash[:8]}...")
+        return cached_response
     
     # Check quota
     if not quota_manager.can_make_request():
         log_api_call("GEMINI", "QUOTA_LIMIT", "Daily quota limit reached")
         return "⚠️ **API Quota Exceeded** - I've reached my daily request limit. Please try again later."
     
-    # Check cache first
-    cached_response = quota_manager.get_cached_response(prompt_hash)
-    if cached_response:
-        llm_logger.info(f"Returning cached response for: {prompt_hash[:8]}...")
-        return cached_response
-    
-    # Make API call
-    response = ask_gemini_cached(prompt_hash, prompt)
+    # Make API call - request_cache above is the only cache, so its TTL holds
+    response = _call_gemini(prompt)
     
-    # Record request and cache response
-    quota_manager.record_request(prompt_hash)
-    quota_manager.cache_response(prompt_hash, response)
+    # Record request and cache response; error replies are not worth reusing
+    quota_manager.record_request()
+    if not response.startswith(_ERROR_PREFIX):
+        quota_manager.cache_response(prompt_hash, response)
     
     return response
 
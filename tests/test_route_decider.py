@@ -0,0 +1,24 @@
+"""
+Structured user data routing in the support agent
+"""
+
+import pytest
+
+from agents.support_agent import route_decider
+
+
+def _route(query: str) -> str:
+    return route_decider({"query": query, "conversation_state": "idle"})
+
+
+@pytest.mark.parametrize("query", [
+    "John, Doe, john@example.com",
+    "john@example.com, John Doe",
+    "a,b@c",
+])
+def test_comma_and_at_sign_route_to_user_creation(query):
+    assert _route(query) == "create_user_node"
+
+
+def test_at_sign_without_comma_is_not_structured_data():
+    assert _route("a b@c") != "create_user_node"
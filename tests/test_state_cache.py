@@ -0,0 +1,41 @@
+"""
+Exact (prior state, message) cache in front of the multi-agent graph
+"""
+
+import uuid
+
+from agents import multi_agent_system as mas
+from agents.state_schema import ConversationState, add_message_to_state
+
+
+class _ReadOnlyGraph:
+    """Stands in for the compiled graph: answers from the knowledge base and saves the turn"""
+
+    def __init__(self, system):
+        self.system = system
+        self.calls = 0
+
+    def invoke(self, state):
+        self.calls += 1
+        state = add_message_to_state(state, "Services are listed under Settings.", "assistant",
+                                     agent_id="knowledge_base")
+        state["active_agent"] = "knowledge_base"
+        state["conversation_state"] = ConversationState.IDLE.value
+        return self.system._save_session_node(state)
+
+
+def test_identical_consecutive_requests_hit_state_cache(monkeypatch):
+    actions = []
+    monkeypatch.setattr(mas, "log_action", lambda action, *args, **kwargs: actions.append(action))
+
+    system = mas.MultiAgentSystem()
+    system.graph = _ReadOnlyGraph(system)
+    session_id = f"test-{uuid.uuid4().hex}"
+
+    first = system.process_message("tester", session_id, "where do I find the services list")
+    second = system.process_message("tester", session_id, "where do I find the services list")
+
+    assert system.graph.calls == 1
+    assert "STATE_CACHE_HIT" in actions
+    assert second["cached"] is True
+    assert second["response"] == first["response"]
@@ -0,0 +1,35 @@
+"""
+Topic switch detection in the multi-agent router
+"""
+
+import pytest
+
+from agents.multi_agent_system import MultiAgentSystem
+
+
+def _switches(message: str, current_agent: str) -> bool:
+    # _indicates_topic_switch only reads module-level keyword tables
+    return MultiAgentSystem._indicates_topic_switch(None, message, current_agent)
+
+
+@pytest.mark.parametrize("message, current_agent", [
+    ("list all services", "user_management"),
+    ("show me the users", "service_management"),
+    ("which users were created today", "knowledge_base"),
+    ("I have problems with the services", "conversation_manager"),
+    ("user was added yesterday", "knowledge_base"),
+])
+def test_plural_and_inflected_keywords_switch_topic(message, current_agent):
+    assert _switches(message, current_agent)
+
+
+@pytest.mark.parametrize("message, current_agent", [
+    ("john@example.com", "user_management"),
+    ("yes, go ahead", "service_management"),
+])
+def test_unrelated_messages_keep_topic(message, current_agent):
+    assert not _switches(message, current_agent)
+
+
+def test_question_indicators_always_switch():
+    assert _switches("tell me about the company", "user_management")
@@ -1,8 +1,10 @@
 import json
 import os
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
 
 FAQ_FILE = os.path.join("context", "faq.json")
+_CONTEXT_CACHE_SIZE = 1024
 
 def load_faq() -> List[Dict[str, Any]]:
     """Load FAQ data from JSON file"""
@@ -99,11 +101,34 @@ def format_faq_results(faqs: List[Dict[str, Any]]) -> str:
     
     return result
 
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def _faq_version() -> Optional[int]:
+    """Modification time of the FAQ file, so cached contexts expire when it is edited"""
+    try:
+        return os.stat(FAQ_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+@lru_cache(maxsize=_CONTEXT_CACHE_SIZE)
+def _faq_context(normalized_query: str, limit: int, version: Optional[int]) -> str:
+    results = search_faq(normalized_query, limit=limit)
+    return format_faq_results(results) if results else ""
+
+def get_faq_context(query: str, limit: int = 5) -> str:
+    """Formatted FAQ matches for a query, or "" if none match; repeated queries are served from cache"""
+    return _faq_context(_normalize_query(query), limit, _faq_version())
+
 def get_enhanced_troubleshooting_context(query: str) -> str:
     """
     Get comprehensive troubleshooting context including both
     specific troubleshooting steps and relevant FAQs
     """
+    return _troubleshooting_context(_normalize_query(query), _faq_version())
+
+@lru_cache(maxsize=_CONTEXT_CACHE_SIZE)
+def _troubleshooting_context(query: str, version: Optional[int]) -> str:
     # Get FAQ results
     faq_results = search_faq(query, limit=3)
     
@@ -1,18 +1,50 @@
-from typing import Dict, Any, Optional, Tuple
+import threading
+import weakref
+from typing import Dict, Any, NamedTuple, Optional, Tuple
 from .user_data_manager import user_manager
 from .session_manager import session_manager, ConversationState
 from context.role_context import get_contextual_prompt
 from logger_config import user_mgmt_logger, session_logger, log_user_mgmt, log_action, log_error
 
+class UserOpResult(NamedTuple):
+    """Reply to a user management request plus the session state it left behind"""
+    response: str
+    state: ConversationState
+    data: Dict[str, Any]  # copy of the session data, safe to hand to callers
+
 class InteractiveUserManager:
     """Handles interactive user management with multi-turn conversations"""
     
     def __init__(self):
         self.required_fields = ['first_name', 'last_name']
         self.optional_fields = ['level', 'department', 'role', 'property', 'address1', 'address2', 'city', 'state', 'country', 'language']
-        
-    def process_user_request(self, query: str, session_id: str = "default") -> str:
+        # Weak values: a session's lock lives only while a request holds it,
+        # so the map does not keep one lock per session ever seen
+        self._session_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+        self._session_locks_guard = threading.Lock()  # guards the session -> lock map
+        
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        """Lock serializing requests of one session; other sessions never contend for it"""
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            with self._session_locks_guard:
+                lock = self._session_locks.setdefault(session_id, threading.Lock())
+        return lock
+        
+    def process_user_request(self, query: str, session_id: str = "default") -> UserOpResult:
         """Main entry point for processing user management requests"""
+        # A multi-turn flow reads and writes its session across several calls,
+        # so one session's turns run one at a time
+        with self._session_lock(session_id):
+            response = self._dispatch_user_request(query, session_id)
+            
+            # Read back once here - clear_session replaces the session dict, so
+            # the one fetched before dispatch may be stale
+            session = session_manager.get_session(session_id)
+            return UserOpResult(response, session['state'], session['data'].copy())
+    
+    def _dispatch_user_request(self, query: str, session_id: str) -> str:
+        """Route a request to the handler for the current conversation state"""
         session = session_manager.get_session(session_id)
         current_state = session['state']
         
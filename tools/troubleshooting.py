@@ -25,23 +25,31 @@ def get_troubleshooting(query):
     
     return "Sorry, I don't have specific troubleshooting steps for that yet, but I can provide general assistance."
 
-def get_combined_help_context(query):
+def find_specific_troubleshooting(query):
     """
-    Get comprehensive help context combining troubleshooting and FAQ
+    Return the answer of the first troubleshooting entry whose
+    question appears in the query, or None
+    """
+    query_lower = query.lower()
+    for item in load_troubleshooting():
+        if item["question"].lower() in query_lower:
+            return item["answer"]
+    return None
+
+def combine_help_context(specific_answer, faq_context):
+    """
+    Merge a specific troubleshooting answer (if any) with FAQ context
     """
-    # Check troubleshooting first
-    trouble_data = load_troubleshooting()
-    specific_answer = None
-    
-    for item in trouble_data:
-        if item["question"].lower() in query.lower():
-            specific_answer = item["answer"]
-            break
-    
-    # Get FAQ context
-    faq_context = get_enhanced_troubleshooting_context(query)
-    
     if specific_answer:
         return f"Specific Troubleshooting:\n{specific_answer}\n\n{faq_context}"
     else:
         return faq_context
+
+def get_combined_help_context(query):
+    """
+    Get comprehensive help context combining troubleshooting and FAQ
+    """
+    return combine_help_context(
+        find_specific_troubleshooting(query),
+        get_enhanced_troubleshooting_context(query)
+    )